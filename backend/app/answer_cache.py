@@ -0,0 +1,186 @@
+import os
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "600"))
+# Cosine similarity of query embeddings above which two questions share an answer
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+
+_non_word = re.compile(r"[^\w\s]+")
+_spaces = re.compile(r"\s+")
+_numbers = re.compile(r"\d+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase, drop punctuation and collapse whitespace
+    """
+    return _spaces.sub(" ", _non_word.sub(" ", question.lower())).strip()
+
+
+def question_entities(normalized: str, names: list) -> frozenset:
+    """
+    Known names (providers, districts) and numbers mentioned in a normalized question.
+    Semantic hits must mention exactly the same entities, so "Hanif contact" never
+    answers "Ena contact" however close their embeddings are.
+    """
+    padded = f" {normalized} "
+    found = {name.lower() for name in names if f" {name.lower()} " in padded}
+    found.update(_numbers.findall(normalized))
+    return frozenset(found)
+
+
+class _Entry:
+    __slots__ = ("result", "query_type", "embedding", "entities", "expires_at")
+
+    def __init__(self, result, query_type, embedding, entities, expires_at):
+        self.result = result
+        self.query_type = query_type
+        self.embedding = embedding
+        self.entities = entities
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """
+    LRU + TTL cache of answers keyed on the normalized question, with a
+    near-duplicate lookup on normalized query embeddings.
+    The cache is tied to a generation (e.g. index and data versions); any
+    change of generation drops every entry.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.generation = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_generation(self, generation):
+        if generation != self.generation:
+            if self._entries:
+                logger.info(f"Answer cache invalidated ({len(self._entries)} entries), generation {generation}")
+                self.invalidations += 1
+            self._entries.clear()
+            self.generation = generation
+
+    def get(self, normalized: str, generation):
+        """
+        Exact lookup on the normalized question, or None
+        """
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(normalized)
+            if entry is not None:
+                if entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(normalized)
+                    self.exact_hits += 1
+                    return entry.result
+                del self._entries[normalized]
+            return None
+
+    def get_similar(self, embedding, query_type: str, entities: frozenset, generation):
+        """
+        Near-duplicate lookup: best live entry of the same query type and entities whose
+        embedding similarity is above the threshold, or None
+        """
+        if embedding is None:
+            return None
+        query = _unit(embedding)
+        with self._lock:
+            self._check_generation(generation)
+            now = time.monotonic()
+            keys, vectors = [], []
+            for key, entry in self._entries.items():
+                if (entry.embedding is not None and entry.query_type == query_type
+                        and entry.entities == entities and entry.expires_at > now):
+                    keys.append(key)
+                    vectors.append(entry.embedding)
+            if not keys:
+                return None
+            scores = np.vstack(vectors) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+            self._entries.move_to_end(keys[best])
+            self.semantic_hits += 1
+            logger.info(f"Answer cache semantic hit ({scores[best]:.3f}): {keys[best]}")
+            return self._entries[keys[best]].result
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def put(self, normalized: str, result: dict, query_type: str, generation,
+            embedding=None, entities: frozenset = frozenset()):
+        """
+        Store an answer, evicting the least recently used entries beyond max_entries
+        """
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[normalized] = _Entry(
+                result, query_type, _unit(embedding) if embedding is not None else None,
+                entities, time.monotonic() + self.ttl_seconds
+            )
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "similarity_threshold": self.similarity_threshold,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# Global answer cache instance
+answer_cache = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """
+    Get or create the answer cache
+    """
+    global answer_cache
+    if answer_cache is None:
+        answer_cache = AnswerCache()
+    return answer_cache
@@ -0,0 +1,335 @@
+import io
+import os
+import csv
+import sys
+import json
+import time
+import logging
+from sqlalchemy import insert, update, delete, select, tuple_
+from sqlalchemy.orm import Session
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import District, DroppingPoint, BusProvider, provider_coverage
+from app.data_version import bump_data_version
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Records applied per round of multi-row statements
+BATCH_SIZE = 5000
+# On PostgreSQL, at least this many new dropping points in a batch are loaded with COPY
+COPY_THRESHOLD = 1000
+
+
+def read_records(path: str):
+    """
+    Stream network records from a file as tuples:
+    ("district", name), ("dropping_point", district, name, price), ("coverage", provider, district)
+    - .json: the data/data.json layout ({"districts": [...], "bus_providers": [...]})
+    - .jsonl: one district ({"name", "dropping_points"}) or provider ({"name", "coverage_districts"}) per line
+    - .csv: dropping points (header district,dropping_point,price) or coverage (header provider,district)
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            columns = set(reader.fieldnames or [])
+            if {"district", "dropping_point", "price"} <= columns:
+                for row in reader:
+                    yield ("dropping_point", row["district"].strip(), row["dropping_point"].strip(), int(row["price"]))
+            elif {"provider", "district"} <= columns:
+                for row in reader:
+                    yield ("coverage", row["provider"].strip(), row["district"].strip())
+            else:
+                raise ValueError(f"{path}: unrecognized CSV header {reader.fieldnames}")
+        return
+
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield from _object_records(json.loads(line))
+        return
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for district in data.get("districts", []):
+        yield from _object_records(district)
+    for provider in data.get("bus_providers", []):
+        yield from _object_records(provider)
+
+
+def _object_records(obj: dict):
+    if "coverage_districts" in obj:
+        for district in obj["coverage_districts"]:
+            yield ("coverage", obj["name"], district)
+    else:
+        yield ("district", obj["name"])
+        for point in obj.get("dropping_points", []):
+            yield ("dropping_point", obj["name"], point["name"], point["price"])
+
+
+class BulkLoader:
+    """
+    Idempotent loader for districts, dropping points, providers and coverage.
+    The current tables are read once; each batch of records is diffed against
+    them and only new or changed rows are written, with multi-row INSERTs
+    (COPY for large dropping point batches on PostgreSQL) and an executemany
+    UPDATE for price changes. Re-running with the same input writes nothing.
+    """
+
+    def __init__(self, db: Session, batch_size: int = BATCH_SIZE, prune: bool = False):
+        self.db = db
+        self.batch_size = batch_size
+        # Delete dropping points and coverage that aren't in the input
+        self.prune = prune
+        self.stats = {
+            "districts": {"inserted": 0},
+            "providers": {"inserted": 0},
+            "dropping_points": {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0},
+            "coverage": {"inserted": 0, "unchanged": 0, "deleted": 0, "skipped": 0},
+        }
+        self._snapshot()
+
+    def _snapshot(self):
+        db = self.db
+        self.districts = {name: id for id, name in db.execute(select(District.id, District.name))}
+        self.providers = {name: id for id, name in db.execute(select(BusProvider.id, BusProvider.name))}
+        self.points = {
+            (district_id, name): (id, price)
+            for id, district_id, name, price in db.execute(
+                select(DroppingPoint.id, DroppingPoint.district_id, DroppingPoint.name, DroppingPoint.price)
+            )
+        }
+        self.coverage = set(db.execute(select(provider_coverage.c.provider_id, provider_coverage.c.district_id)))
+        self.seen_points = set()
+        self.seen_coverage = set()
+        # Tables the input had records for; only these are pruned
+        self.seen_tables = set()
+
+    @property
+    def changed(self) -> bool:
+        return any(count for table, counts in self.stats.items()
+                   for kind, count in counts.items() if kind in ("inserted", "updated", "deleted"))
+
+    def load(self, records) -> dict:
+        """
+        Apply a stream of records; returns the per-table counts so far
+        """
+        started = time.monotonic()
+        total = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                total += self._apply(batch)
+                batch = []
+                logger.info(f"Loaded {total} records ({total / (time.monotonic() - started):.0f}/s)")
+        total += self._apply(batch)
+        logger.info(f"Loaded {total} records in {time.monotonic() - started:.2f}s")
+        return self.stats
+
+    def finish(self) -> dict:
+        """
+        After all input is loaded: prune if asked and bump the data version if anything changed.
+        The caller is responsible for committing the session.
+        """
+        if self.prune:
+            self._prune()
+        if self.changed:
+            # Invalidate in-memory route indexes built from the previous data
+            bump_data_version(self.db)
+        logger.info(f"Bulk load: {self.stats}")
+        return self.stats
+
+    def _insert_names(self, model, names: list, ids: dict, counts: dict):
+        """
+        Insert the names not present yet and record their new ids
+        """
+        new = [name for name in dict.fromkeys(names) if name not in ids]
+        if not new:
+            return
+        rows = self.db.execute(
+            insert(model).returning(model.id, model.name, sort_by_parameter_order=True),
+            [{"name": name} for name in new]
+        )
+        ids.update({name: id for id, name in rows})
+        counts["inserted"] += len(new)
+
+    def _apply(self, batch: list) -> int:
+        if not batch:
+            return 0
+
+        # District and provider objects list their dropping points and coverage in full
+        for record in batch:
+            self.seen_tables.add("coverage" if record[0] == "coverage" else "dropping_points")
+
+        # Parents first, so dropping points and coverage can refer to their ids
+        self._insert_names(
+            District,
+            [r[1] for r in batch if r[0] in ("district", "dropping_point")],
+            self.districts, self.stats["districts"]
+        )
+
+        # Coverage of unknown districts is skipped before its provider is inserted,
+        # so a skipped row never leaves a provider behind
+        coverage = []
+        for record in batch:
+            if record[0] != "coverage":
+                continue
+            if record[2] not in self.districts:
+                logger.warning(f"Coverage of {record[1]} refers to unknown district {record[2]}, skipped")
+                self.stats["coverage"]["skipped"] += 1
+                continue
+            coverage.append(record)
+        self._insert_names(BusProvider, [r[1] for r in coverage], self.providers, self.stats["providers"])
+
+        # Last price wins when a dropping point repeats in the input
+        prices = {}
+        for record in batch:
+            if record[0] == "dropping_point":
+                prices[(self.districts[record[1]], record[2])] = record[3]
+
+        new_points, changed_prices = [], []
+        for key, price in prices.items():
+            self.seen_points.add(key)
+            current = self.points.get(key)
+            if current is None:
+                new_points.append({"district_id": key[0], "name": key[1], "price": price})
+            elif current[1] != price:
+                changed_prices.append({"id": current[0], "price": price})
+                self.points[key] = (current[0], price)
+            else:
+                self.stats["dropping_points"]["unchanged"] += 1
+
+        if new_points:
+            self._insert_points(new_points)
+        if changed_prices:
+            self.db.execute(update(DroppingPoint), changed_prices)
+            self.stats["dropping_points"]["updated"] += len(changed_prices)
+
+        new_coverage = []
+        for record in coverage:
+            pair = (self.providers[record[1]], self.districts[record[2]])
+            if pair in self.seen_coverage:
+                continue
+            self.seen_coverage.add(pair)
+            if pair in self.coverage:
+                self.stats["coverage"]["unchanged"] += 1
+            else:
+                new_coverage.append({"provider_id": pair[0], "district_id": pair[1]})
+                self.coverage.add(pair)
+
+        if new_coverage:
+            self.db.execute(provider_coverage.insert(), new_coverage)
+            self.stats["coverage"]["inserted"] += len(new_coverage)
+
+        return len(batch)
+
+    def _insert_points(self, rows: list):
+        """
+        Insert new dropping points and record their ids
+        """
+        if self.db.get_bind().dialect.name == "postgresql" and len(rows) >= COPY_THRESHOLD:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow((row["district_id"], row["name"], row["price"]))
+            buffer.seek(0)
+            # COPY on the session's own connection, inside its transaction
+            cursor = self.db.connection().connection.cursor()
+            try:
+                cursor.copy_expert(
+                    "COPY dropping_points (district_id, name, price) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            finally:
+                cursor.close()
+            keys = [(row["district_id"], row["name"]) for row in rows]
+            inserted = self.db.execute(
+                select(DroppingPoint.id, DroppingPoint.district_id, DroppingPoint.name, DroppingPoint.price)
+                .where(tuple_(DroppingPoint.district_id, DroppingPoint.name).in_(keys))
+            )
+        else:
+            inserted = self.db.execute(
+                insert(DroppingPoint).returning(
+                    DroppingPoint.id, DroppingPoint.district_id, DroppingPoint.name, DroppingPoint.price,
+                    sort_by_parameter_order=True
+                ),
+                rows
+            )
+        for id, district_id, name, price in inserted:
+            self.points[(district_id, name)] = (id, price)
+        self.stats["dropping_points"]["inserted"] += len(rows)
+
+    def _prune(self):
+        """
+        Delete the dropping points and coverage missing from the input, for
+        each table the input had records for
+        """
+        if "dropping_points" in self.seen_tables:
+            self._prune_points()
+        if "coverage" in self.seen_tables:
+            self._prune_coverage()
+
+    def _prune_points(self):
+        stale_points = [id for key, (id, _) in self.points.items() if key not in self.seen_points]
+        for start in range(0, len(stale_points), self.batch_size):
+            self.db.execute(delete(DroppingPoint).where(DroppingPoint.id.in_(stale_points[start:start + self.batch_size])))
+        self.stats["dropping_points"]["deleted"] = len(stale_points)
+
+    def _prune_coverage(self):
+        stale_coverage = self.coverage - self.seen_coverage
+        if stale_coverage:
+            self.db.execute(
+                delete(provider_coverage).where(
+                    tuple_(provider_coverage.c.provider_id, provider_coverage.c.district_id).in_(list(stale_coverage))
+                )
+            )
+        self.stats["coverage"]["deleted"] = len(stale_coverage)
+
+
+def load_files(db: Session, paths: list, batch_size: int = BATCH_SIZE, prune: bool = False,
+               dry_run: bool = False) -> dict:
+    """
+    Load network files in order in one transaction; with dry_run the diff is
+    computed and reported but rolled back
+    """
+    loader = BulkLoader(db, batch_size=batch_size, prune=prune)
+    try:
+        for path in paths:
+            logger.info(f"Loading {path}...")
+            loader.load(read_records(path))
+        loader.finish()
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return loader.stats
+
+
+def main():
+    import argparse
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Bulk load districts, dropping points and provider coverage")
+    parser.add_argument("paths", nargs="+", help=".json (data.json layout), .jsonl or .csv files")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="records per round of multi-row statements")
+    parser.add_argument("--prune", action="store_true", help="delete dropping points and coverage missing from the input "
+                             "(only for the tables the input has records for)")
+    parser.add_argument("--dry-run", action="store_true", help="report the diff without writing it")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = load_files(db, args.paths, args.batch_size, args.prune, args.dry_run)
+    finally:
+        db.close()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
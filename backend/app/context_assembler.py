@@ -0,0 +1,91 @@
+import os
+import re
+import math
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Most context tokens sent to the RAG answer model per question
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1200"))
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate BPE token count: about four characters per token for words,
+    one token per punctuation mark. Close enough for budgeting without a tokenizer.
+    """
+    return sum(math.ceil(len(piece) / 4) if piece[0].isalnum() or piece[0] == "_" else 1
+               for piece in _PIECE.findall(text or ""))
+
+
+def _lines(document: str) -> list:
+    """
+    Non-empty stripped lines of a chunk, in document order, without repeats
+    """
+    return list(dict.fromkeys(line.strip() for line in (document or "").split("\n") if line.strip()))
+
+
+def assemble_context(documents: list, metadatas: list, token_budget: int = RAG_CONTEXT_TOKEN_BUDGET) -> tuple:
+    """
+    Select the chunks to put in the prompt from chunks ranked by relevance.
+    - A chunk whose lines are all contained in another candidate (e.g. a provider's
+      contact section inside its complete document) is merged into that candidate
+      and only used on its own if the larger chunk doesn't fit the budget.
+    - Chunks are taken best first while they fit the token budget; if none fits,
+      the best chunk is trimmed to the whole lines that fit.
+    - Lines keep their order within each chunk.
+    Returns (documents, metadatas, context token count)
+    """
+    candidates = [(_lines(doc), doc, meta or {}) for doc, meta in zip(documents, metadatas)]
+    line_sets = [set(lines) for lines, _, _ in candidates]
+
+    # Each chunk is merged into the largest candidate containing it (itself if none);
+    # identical chunks merge into the better ranked one
+    owner = [
+        max(
+            (i for i, lines_i in enumerate(line_sets) if lines_j <= lines_i),
+            key=lambda i: (len(line_sets[i]), -i)
+        )
+        for lines_j in line_sets
+    ]
+
+    # Units in relevance order: an outer chunk ranks as high as its best contained chunk
+    units = []
+    for j in range(len(candidates)):
+        if owner[j] not in [unit[0] for unit in units]:
+            units.append((owner[j], [k for k in range(len(candidates)) if owner[k] == owner[j] and k != owner[j]]))
+
+    selected = []
+    used = 0
+    for outer, inner in units:
+        cost = estimate_tokens(candidates[outer][1])
+        if used + cost <= token_budget:
+            selected.append((outer, candidates[outer][1]))
+            used += cost
+            continue
+        # Too big: fall back to the smaller chunks it contains
+        for k in inner:
+            cost = estimate_tokens(candidates[k][1])
+            if used + cost <= token_budget:
+                selected.append((k, candidates[k][1]))
+                used += cost
+
+    if not selected and candidates:
+        # Even the best chunk is over budget: keep as many of its lines as fit, in order
+        best = units[0][0]
+        kept = []
+        for line in candidates[best][0]:
+            cost = estimate_tokens(line)
+            if used + cost <= token_budget:
+                kept.append(line)
+                used += cost
+        selected.append((best, "\n".join(kept)))
+
+    dropped = len(candidates) - len(selected)
+    if dropped:
+        logger.info(f"Context assembly: kept {len(selected)} of {len(candidates)} chunks, {used} tokens (budget {token_budget})")
+
+    return [doc for _, doc in selected], [candidates[k][2] for k, _ in selected], used
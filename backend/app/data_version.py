@@ -0,0 +1,30 @@
+from sqlalchemy.orm import Session
+from .models import DataVersion
+
+# Version stamp covering districts, dropping points, providers and coverage
+REFERENCE_DATA = "reference"
+# Version stamp of the indexed provider documents (vector store and local indexes)
+PROVIDER_DOCS = "provider_docs"
+
+
+def get_data_version(db: Session, name: str = REFERENCE_DATA) -> int:
+    """
+    Get the current version stamp for a data set (0 if never bumped)
+    """
+    row = db.query(DataVersion.version).filter(DataVersion.name == name).first()
+    return row[0] if row else 0
+
+
+def bump_data_version(db: Session, name: str = REFERENCE_DATA) -> int:
+    """
+    Increment the version stamp for a data set.
+    The caller is responsible for committing the session.
+    """
+    row = db.query(DataVersion).filter(DataVersion.name == name).first()
+    if row is None:
+        row = DataVersion(name=name, version=1)
+        db.add(row)
+    else:
+        row.version += 1
+    db.flush()
+    return row.version
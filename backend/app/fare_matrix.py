@@ -0,0 +1,95 @@
+import threading
+import logging
+import numpy as np
+from .route_index import RouteIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FareMatrix:
+    """
+    Minimum fare for every origin x destination x provider, computed in one
+    broadcast from a RouteIndex snapshot. A provider serves a pair when it
+    covers both districts, at the destination's cheapest dropping point (the
+    first price a direct search returns); unserved cells are NaN.
+    """
+
+    def __init__(self, index: RouteIndex):
+        self.version = index.version
+        self.provider_names = index.provider_names
+        self.district_ids, coverage = index.coverage_matrix()
+        names = {district_id: name for name, district_id in index.district_ids.items()}
+        self.district_names = [names[district_id] for district_id in self.district_ids]
+        self._district_positions = {district_id: i for i, district_id in enumerate(self.district_ids)}
+        self._provider_positions = {name: i for i, name in enumerate(self.provider_names)}
+
+        # served[o, d, p]: provider p covers both o and d
+        served = coverage[:, np.newaxis, :] & coverage[np.newaxis, :, :]
+        served[np.arange(len(self.district_ids)), np.arange(len(self.district_ids)), :] = False
+        cheapest = index.cheapest_prices(self.district_ids).astype(np.float32)
+        self.fares = np.where(served, cheapest[np.newaxis, :, np.newaxis], np.float32(np.nan))
+
+        logger.info(
+            f"Built fare matrix v{self.version}: {self.fares.shape[0]}x{self.fares.shape[1]} districts, "
+            f"{self.fares.shape[2]} providers, {int(served.sum())} served cells"
+        )
+
+    def slice(self, from_id: int = None, provider: str = None) -> dict:
+        """
+        Fares for one origin and/or one provider (or all of them), as served
+        (from, to) rows with the providers offering that fare, plus
+        min/median/max over the slice. Without a provider each pair's fare is
+        the cheapest across providers.
+        """
+        origins = slice(None) if from_id is None else [self._district_positions[from_id]]
+        providers = slice(None) if provider is None else [self._provider_positions[provider]]
+        cube = self.fares[origins][:, :, providers]
+
+        # Cheapest across the selected providers; all-NaN pairs stay NaN
+        served = ~np.isnan(cube)
+        pair_min = np.where(served.any(axis=2), np.nanmin(np.where(served, cube, np.inf), axis=2), np.nan)
+        cheapest = served & (cube == pair_min[:, :, np.newaxis])
+
+        provider_names = self.provider_names if provider is None else [provider]
+        origin_names = self.district_names if from_id is None else [self.district_names[origins[0]]]
+        rows = []
+        for o, d in zip(*np.nonzero(~np.isnan(pair_min))):
+            rows.append({
+                "from_district": origin_names[o],
+                "to_district": self.district_names[d],
+                "price": int(pair_min[o, d]),
+                "providers": [provider_names[p] for p in np.flatnonzero(cheapest[o, d])],
+            })
+
+        values = pair_min[~np.isnan(pair_min)]
+        stats = None
+        if values.size:
+            stats = {
+                "count": int(values.size),
+                "min": float(values.min()),
+                "median": float(np.median(values)),
+                "max": float(values.max()),
+            }
+        return {"version": self.version, "fares": rows, "stats": stats}
+
+
+# Global fare matrix, rebuilt on first use of each reference data version
+fare_matrix = None
+_fare_matrix_lock = threading.Lock()
+
+
+def get_fare_matrix(index: RouteIndex) -> FareMatrix:
+    """
+    Get the fare matrix for a route index snapshot, building it on first
+    use of each reference data version
+    """
+    global fare_matrix
+    matrix = fare_matrix
+    if matrix is not None and matrix.version == index.version:
+        return matrix
+
+    with _fare_matrix_lock:
+        if fare_matrix is None or fare_matrix.version != index.version:
+            fare_matrix = FareMatrix(index)
+        return fare_matrix
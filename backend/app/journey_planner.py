@@ -0,0 +1,169 @@
+import heapq
+import threading
+import logging
+import numpy as np
+from .route_index import RouteIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JourneyPlanner:
+    """
+    District graph derived from a RouteIndex snapshot, for journeys that
+    change buses. There is a leg from A to B when some provider covers both
+    districts; its fare is the cheapest dropping point in B, the same price a
+    direct search from A to B returns first.
+
+    Stored as dense NumPy matrices over districts (in id order):
+    - coverage: district x provider booleans
+    - fares: leg fare between every pair of districts (inf where no provider
+      covers both, and on the diagonal)
+    """
+
+    def __init__(self, index: RouteIndex):
+        self.index = index
+        self.version = index.version
+        self.district_ids, self.coverage = index.coverage_matrix()
+        self.district_names = {district_id: name for name, district_id in index.district_ids.items()}
+        self._positions = {district_id: i for i, district_id in enumerate(self.district_ids)}
+        n_districts = len(self.district_ids)
+
+        # A district without dropping points can't be travelled to
+        cheapest = np.nan_to_num(index.cheapest_prices(self.district_ids), nan=np.inf)
+
+        # Two districts are connected when their coverage rows share a provider
+        shared = self.coverage.astype(np.int32) @ self.coverage.T.astype(np.int32)
+        self.fares = np.where(shared > 0, cheapest[np.newaxis, :], np.inf)
+        np.fill_diagonal(self.fares, np.inf)
+
+        logger.info(
+            f"Built journey planner v{self.version}: {n_districts} districts, "
+            f"{int(np.isfinite(self.fares).sum())} legs"
+        )
+
+    def _shortest(self, fares: np.ndarray, source: int, target: int, max_legs: int):
+        """
+        Cheapest path from source to target with at most max_legs legs, as
+        (cost, [positions]) or None. Bellman-Ford limited to max_legs rounds,
+        each round a vectorized min-plus product of the previous distances
+        with the fare matrix. Fewer legs win ties.
+        """
+        n = len(fares)
+        distances = np.full((max_legs + 1, n), np.inf)
+        parents = np.zeros((max_legs + 1, n), dtype=np.int64)
+        distances[0, source] = 0.0
+        for legs in range(1, max_legs + 1):
+            candidates = distances[legs - 1][:, np.newaxis] + fares
+            parents[legs] = candidates.argmin(axis=0)
+            distances[legs] = candidates[parents[legs], np.arange(n)]
+
+        # The first (fewest legs) minimum over exactly-1..max_legs-leg walks is a
+        # simple path: fares are non-negative, so a cycle never makes it cheaper
+        legs = int(distances[1:, target].argmin()) + 1
+        cost = distances[legs, target]
+        if not np.isfinite(cost):
+            return None
+
+        path = [target]
+        for row in range(legs, 0, -1):
+            path.append(int(parents[row, path[-1]]))
+        path.reverse()
+        return float(cost), path
+
+    def _k_shortest(self, source: int, target: int, max_legs: int, k: int) -> list:
+        """
+        Yen's k shortest loopless paths, each with at most max_legs legs:
+        every next path deviates from an accepted one at some spur district,
+        avoiding the legs already taken from that same root and the districts
+        before the spur
+        """
+        first = self._shortest(self.fares, source, target, max_legs)
+        if first is None:
+            return []
+
+        accepted = [first]
+        candidates = []
+        seen = {tuple(first[1])}
+        while len(accepted) < k:
+            _, last_path = accepted[-1]
+            for spur in range(len(last_path) - 1):
+                root = last_path[:spur + 1]
+                remaining_legs = max_legs - spur
+                if remaining_legs < 1:
+                    break
+
+                fares = self.fares.copy()
+                for _, path in accepted:
+                    if path[:spur + 1] == root and len(path) > spur + 1:
+                        fares[path[spur], path[spur + 1]] = np.inf
+                for position in root[:-1]:
+                    fares[position, :] = np.inf
+                    fares[:, position] = np.inf
+
+                found = self._shortest(fares, root[-1], target, remaining_legs)
+                if found is None:
+                    continue
+                spur_cost, spur_path = found
+                path = root[:-1] + spur_path
+                if tuple(path) in seen:
+                    continue
+                seen.add(tuple(path))
+                root_cost = sum(self.fares[a, b] for a, b in zip(root, root[1:]))
+                heapq.heappush(candidates, (float(root_cost) + spur_cost, len(path), path))
+
+            if not candidates:
+                break
+            cost, _, path = heapq.heappop(candidates)
+            accepted.append((cost, path))
+
+        return accepted
+
+    def journeys(self, from_id: int, to_id: int, max_transfers: int = 1, limit: int = 5) -> list:
+        """
+        Cheapest itineraries from one district to another with at most
+        max_transfers changes, cheapest first (fewer legs on equal fares).
+        Each is a dict with total_price, transfers and legs; a leg lists the
+        providers that run it and its cheapest dropping point.
+        """
+        source = self._positions.get(from_id)
+        target = self._positions.get(to_id)
+        if source is None or target is None or source == target:
+            return []
+
+        journeys = []
+        for cost, path in self._k_shortest(source, target, max_transfers + 1, limit):
+            legs = []
+            for a, b in zip(path, path[1:]):
+                from_district_id, to_district_id = self.district_ids[a], self.district_ids[b]
+                drop_point, price = self.index.dropping_points_for(to_district_id)[0]
+                legs.append({
+                    "from_district": self.district_names[from_district_id],
+                    "to_district": self.district_names[to_district_id],
+                    "providers": self.index.providers_between(from_district_id, to_district_id),
+                    "drop_point": drop_point,
+                    "price": price,
+                })
+            journeys.append({"total_price": int(cost), "transfers": len(legs) - 1, "legs": legs})
+        return journeys
+
+
+# Global journey planner, rebuilt whenever the route index is
+journey_planner = None
+_journey_planner_lock = threading.Lock()
+
+
+def get_journey_planner(index: RouteIndex) -> JourneyPlanner:
+    """
+    Get the journey planner for a route index snapshot, building it on first
+    use of each reference data version
+    """
+    global journey_planner
+    planner = journey_planner
+    if planner is not None and planner.version == index.version:
+        return planner
+
+    with _journey_planner_lock:
+        if journey_planner is None or journey_planner.version != index.version:
+            journey_planner = JourneyPlanner(index)
+        return journey_planner
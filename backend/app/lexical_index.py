@@ -0,0 +1,100 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+_TOKEN = re.compile(r"\w+")
+
+# Words too common in questions and provider documents to carry any signal
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "give",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "our", "please", "show", "tell",
+    "the", "their", "this", "to", "us", "we", "what", "whats", "where", "which", "who", "with",
+    "you", "your", "bus", "buses",
+}
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercased word and number tokens without stopwords
+    """
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over document chunks.
+    Keeps the chunk texts and metadatas so lexical hits can be served without
+    another vector store round trip.
+    """
+
+    def __init__(self, ids: list, documents: list, metadatas: list, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.positions = {id_: i for i, id_ in enumerate(self.ids)}
+
+        # term -> [(doc position, term frequency)]
+        self.postings = defaultdict(list)
+        self.lengths = []
+        self.doc_terms = []
+        for position, document in enumerate(self.documents):
+            counts = Counter(tokenize(document or ""))
+            self.lengths.append(sum(counts.values()))
+            self.doc_terms.append(set(counts))
+            for term, tf in counts.items():
+                self.postings[term].append((position, tf))
+
+        n = len(self.ids)
+        self.avg_length = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query: str, n_results: int = 10) -> list:
+        """
+        Top chunks for a query as (id, score) pairs, best first
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / (self.avg_length or 1))
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:n_results]
+        return [(self.ids[position], score) for position, score in ranked]
+
+    def covers(self, query: str, chunk_id: str) -> bool:
+        """
+        True if a chunk contains every (non-stopword) query term
+        """
+        terms = set(tokenize(query))
+        position = self.positions.get(chunk_id)
+        if not terms or position is None:
+            return False
+        return terms <= self.doc_terms[position]
+
+    def get(self, chunk_id: str) -> tuple:
+        """
+        (document, metadata) for a chunk id
+        """
+        position = self.positions[chunk_id]
+        return self.documents[position], self.metadatas[position]
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Fuse several ranked id lists; ids ranked high in any list come first
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking):
+            scores[id_] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda id_: -scores[id_])
@@ -1,16 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import buses, bookings, providers
+from .routes import buses, bookings, providers, trips
+from .startup import readiness, start_warm_up, stop_warm_up, APP_MODE
+from .metrics import registry
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start serving right away and warm up dependencies in the background:
+    database connection and route index, plus the query classifier, vector
+    store and embedding model unless the mode or WARM_UP_RAG leaves them out.
+    /ready reports when that has finished.
+    """
+    warm_up_task = await start_warm_up()
+    yield
+    await stop_warm_up(warm_up_task)
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Bus Booking System API",
     description="API for bus ticket booking with RAG-powered provider information",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -20,12 +39,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include routers
 app.include_router(buses.router)
 app.include_router(bookings.router)
-app.include_router(providers.router)
+app.include_router(trips.router)
+if APP_MODE != "search":
+    # Search-only deployments never import the RAG stack
+    app.include_router(providers.router)
 
 
 @app.get("/")
@@ -36,6 +59,7 @@ def root():
     return {
         "message": "Bus Booking System API",
         "version": "1.0.0",
+        "mode": APP_MODE,
         "docs": "/docs"
     }
 
@@ -48,6 +72,26 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness endpoint: 200 once every component has warmed up, 503 while
+    warm-up is running or if a component failed (it then loads on first use)
+    """
+    components = readiness.snapshot()
+    if readiness.ready:
+        return {"status": "ready", "components": components}
+    return JSONResponse(status_code=503, content={"status": "not ready", "components": components})
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Pipeline stage, LLM and database timings in Prometheus text format
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
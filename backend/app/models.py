@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Table, Index, UniqueConstraint, CheckConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -60,4 +60,62 @@ class Booking(Base):
     status = Column(String, default="active")  # active, cancelled
     
     # Relationships
-    provider = relationship("BusProvider", back_populates="bookings")
\ No newline at end of file
+    provider = relationship("BusProvider", back_populates="bookings")
+    
+    # Serves the newest-first booking history by phone (keyset on booking_date, id)
+    __table_args__ = (
+        Index("ix_bookings_phone_booking_date", "phone", "booking_date", "id"),
+    )
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Trip(Base):
+    __tablename__ = "trips"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    bus_provider_id = Column(Integer, ForeignKey("bus_providers.id"), nullable=False)
+    from_district = Column(String, nullable=False)
+    to_district = Column(String, nullable=False)
+    travel_date = Column(String, nullable=False)  # YYYY-MM-DD
+    departure_time = Column(String, nullable=False)  # HH:MM
+    total_seats = Column(Integer, nullable=False)
+    # Seats neither held nor sold; only ever changed by conditional UPDATEs
+    available_seats = Column(Integer, nullable=False)
+    
+    # Relationships
+    provider = relationship("BusProvider")
+    
+    __table_args__ = (
+        UniqueConstraint("bus_provider_id", "from_district", "to_district", "travel_date", "departure_time",
+                         name="uq_trips_provider_route_departure"),
+        CheckConstraint("available_seats >= 0 AND available_seats <= total_seats", name="ck_trips_available_seats"),
+        Index("ix_trips_route_date", "from_district", "to_district", "travel_date"),
+    )
+
+
+class SeatHold(Base):
+    __tablename__ = "seat_holds"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    trip_id = Column(Integer, ForeignKey("trips.id"), nullable=False, index=True)
+    seats = Column(Integer, nullable=False)
+    user_name = Column(String, nullable=False)
+    phone = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="held")  # held, confirmed, released, expired, cancelled
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Booking created when the hold was confirmed
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=True, index=True)
+    
+    # Serves the sweep for expired holds
+    __table_args__ = (
+        Index("ix_seat_holds_status_expires_at", "status", "expires_at"),
+    )
+
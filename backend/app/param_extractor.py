@@ -0,0 +1,173 @@
+import os
+import re
+import difflib
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Below this confidence, route parameters are extracted by the LLM instead
+PARAM_EXTRACTOR_MIN_CONFIDENCE = float(os.getenv("PARAM_EXTRACTOR_MIN_CONFIDENCE", "0.7"))
+
+# Alternative spellings, old names and Bangla script names of districts
+DISTRICT_ALIASES = {
+    "Dhaka": ["dacca", "dhaka city", "ঢাকা"],
+    "Chattogram": ["chittagong", "chattagram", "ctg", "চট্টগ্রাম"],
+    "Khulna": ["খুলনা"],
+    "Rajshahi": ["rajshai", "রাজশাহী"],
+    "Sylhet": ["silet", "srihatta", "সিলেট"],
+    "Barishal": ["barisal", "বরিশাল"],
+    "Rangpur": ["rongpur", "রংপুর"],
+    "Mymensingh": ["moymonsingh", "mymensing", "ময়মনসিংহ"],
+    "Comilla": ["cumilla", "kumilla", "কুমিল্লা"],
+    "Bogra": ["bogura", "বগুড়া"],
+    "Jessore": ["jashore", "যশোর"],
+    "Cox's Bazar": ["coxs bazar", "cox bazar", "কক্সবাজার"],
+}
+
+FROM_MARKERS = {"from", "departing", "leaving", "starting"}
+TO_MARKERS = {"to", "towards", "till", "until", "into", "reach", "reaching"}
+# Bangla postpositions: "ঢাকা থেকে সিলেট" = from Dhaka to Sylhet
+FROM_POSTPOSITIONS = {"থেকে", "হতে"}
+TO_POSTPOSITIONS = {"পর্যন্ত", "যাবে", "যেতে"}
+
+# Short or common words never fuzzy-matched against district names
+_STOPWORDS = {
+    "from", "bus", "buses", "route", "routes", "price", "prices", "taka", "fare", "which", "what",
+    "there", "under", "below", "cheap", "cheapest", "show", "list", "trip", "travel", "going",
+    "about", "available", "between", "where", "ticket", "tickets", "today", "tomorrow",
+}
+
+_BANGLA_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+_TOKEN = re.compile(r"[a-zঀ-৿]+(?:'[a-z]+)?|\d+")
+_AMOUNT = r"(\d[\d,]*)"
+_CURRENCY = r"(?:৳|tk\.?|taka|bdt|টাকা)"
+_PRICE_LIMIT = re.compile(
+    r"(?:under|below|less than|within|max(?:imum)?(?: price)?(?: of)?|up ?to|at most|not more than|"
+    r"cheaper than|no more than|budget(?: of| is)?|<=?)\s*" + _CURRENCY + r"?\s*" + _AMOUNT
+)
+_PRICE_CURRENCY_FIRST = re.compile(_CURRENCY + r"\s*" + _AMOUNT)
+_PRICE_CURRENCY_LAST = re.compile(_AMOUNT + r"\s*" + _CURRENCY)
+_PRICE_BANGLA_LIMIT = re.compile(_AMOUNT + r"\s*" + _CURRENCY + r"?\s*(?:এর মধ্যে|এর নিচে|এর কমে)")
+
+
+class ParamExtractor:
+    """
+    Rule-based extraction of from_district, to_district and max_price from a
+    route question, using a gazetteer of district names and aliases.
+    """
+
+    def __init__(self, district_names: list):
+        self.gazetteer = {}
+        for name in district_names:
+            self.gazetteer[name.lower()] = name
+            for alias in DISTRICT_ALIASES.get(name, []):
+                self.gazetteer[alias] = name
+        self.max_ngram = max(len(key.split()) for key in self.gazetteer) if self.gazetteer else 1
+        # Single-word keys only are used for fuzzy matching
+        self.fuzzy_keys = [key for key in self.gazetteer if " " not in key]
+
+    def _match_districts(self, tokens: list) -> list:
+        """
+        Find district mentions as (start, end, district, exact) tuples
+        """
+        mentions = []
+        i = 0
+        while i < len(tokens):
+            match = None
+            for n in range(min(self.max_ngram, len(tokens) - i), 0, -1):
+                phrase = " ".join(tokens[i:i + n]).replace("'", "")
+                name = self.gazetteer.get(phrase) or self.gazetteer.get(" ".join(tokens[i:i + n]))
+                if name:
+                    match = (i, i + n, name, True)
+                    break
+            if match is None:
+                token = tokens[i]
+                if len(token) >= 4 and token not in _STOPWORDS and not token.isdigit():
+                    close = difflib.get_close_matches(token, self.fuzzy_keys, n=1, cutoff=0.8)
+                    if close:
+                        match = (i, i + 1, self.gazetteer[close[0]], False)
+            if match:
+                mentions.append(match)
+                i = match[1]
+            else:
+                i += 1
+        return mentions
+
+    def _extract_price(self, text: str):
+        for pattern in (_PRICE_LIMIT, _PRICE_BANGLA_LIMIT, _PRICE_CURRENCY_FIRST, _PRICE_CURRENCY_LAST):
+            match = pattern.search(text)
+            if match:
+                return int(match.group(1).replace(",", ""))
+        return None
+
+    def extract(self, question: str) -> tuple:
+        """
+        Returns (params, confidence) where params has from_district, to_district
+        and max_price (each possibly None) and confidence is between 0 and 1
+        """
+        text = question.lower().translate(_BANGLA_DIGITS)
+        tokens = _TOKEN.findall(text)
+        params = {
+            "from_district": None,
+            "to_district": None,
+            "max_price": self._extract_price(text),
+        }
+
+        mentions = []
+        for start, end, name, exact in self._match_districts(tokens):
+            if not mentions or mentions[-1][2] != name:
+                mentions.append((start, end, name, exact))
+
+        if not mentions:
+            return params, 0.0
+
+        # Assign roles from the word before (English) or after (Bangla) each mention
+        roles = {}
+        for start, end, name, _ in mentions:
+            before = tokens[start - 1] if start > 0 else None
+            after = tokens[end] if end < len(tokens) else None
+            if before in FROM_MARKERS or after in FROM_POSTPOSITIONS:
+                roles.setdefault("from_district", name)
+            elif before in TO_MARKERS or after in TO_POSTPOSITIONS:
+                roles.setdefault("to_district", name)
+            elif before == "between":
+                roles.setdefault("from_district", name)
+
+        marked = len(roles)
+        # Unmarked mentions fill the remaining roles in order of appearance
+        for _, _, name, _ in mentions:
+            if name in roles.values():
+                continue
+            if "from_district" not in roles:
+                roles["from_district"] = name
+            elif "to_district" not in roles:
+                roles["to_district"] = name
+
+        params.update(roles)
+
+        all_exact = all(exact for _, _, _, exact in mentions)
+        if len(mentions) != 2 or params["from_district"] is None or params["to_district"] is None:
+            confidence = 0.4 if len(mentions) == 1 else 0.5
+        elif marked:
+            confidence = 0.95 if all_exact else 0.85
+        else:
+            confidence = 0.75 if all_exact else 0.65
+
+        return params, confidence
+
+
+# Global extractor instance, rebuilt when the district list changes
+param_extractor = None
+_param_extractor_version = None
+
+
+def get_param_extractor(index) -> ParamExtractor:
+    """
+    Get the extractor for the districts in a route index
+    """
+    global param_extractor, _param_extractor_version
+    if param_extractor is None or _param_extractor_version != index.version:
+        param_extractor = ParamExtractor(list(index.district_ids))
+        _param_extractor_version = index.version
+    return param_extractor
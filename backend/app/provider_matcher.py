@@ -0,0 +1,89 @@
+from collections import deque
+
+# Alternative names and spellings users type for providers
+PROVIDER_ALIASES = {
+    "Desh Travel": ["desh travels"],
+    "Ena": ["ena transport", "ena paribahan"],
+    "Green Line": ["greenline", "green line paribahan"],
+    "Hanif": ["hanif enterprise", "hanif paribahan"],
+    "Shyamoli": ["shyamoli paribahan", "shamoli", "shyamoly"],
+    "Soudia": ["saudia", "soudia paribahan"],
+}
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every occurrence of any pattern in one pass over the text
+    """
+
+    def __init__(self, patterns: dict):
+        # Node i: goto transitions, failure link, and (pattern length, value) outputs
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern, value in patterns.items():
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append((len(pattern), value))
+
+        # Breadth-first failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def finditer(self, text: str):
+        """
+        Yield (start, end, value) for every pattern occurrence
+        """
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, value in self.output[node]:
+                yield i - length + 1, i + 1, value
+
+
+class ProviderMatcher:
+    """
+    Detects provider names and aliases mentioned in a question, on word boundaries
+    """
+
+    def __init__(self, provider_names: list):
+        patterns = {}
+        for name in provider_names:
+            patterns[name.lower()] = name
+            patterns[name.lower().replace(" ", "")] = name
+            for alias in PROVIDER_ALIASES.get(name, []):
+                patterns[alias] = name
+        self.providers = sorted(set(provider_names))
+        self.automaton = AhoCorasick(patterns)
+
+    def match(self, question: str) -> list:
+        """
+        Providers mentioned in a question, in order of first mention
+        """
+        text = question.lower()
+        found = []
+        for start, end, name in self.automaton.finditer(text):
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end < len(text) and text[end].isalnum():
+                continue
+            if name not in found:
+                found.append(name)
+        return found
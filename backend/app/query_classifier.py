@@ -0,0 +1,268 @@
+import os
+import re
+import sys
+import zlib
+import logging
+from itertools import chain
+import numpy as np
+from .param_extractor import DISTRICT_ALIASES
+from .provider_matcher import PROVIDER_ALIASES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERY_TYPES = ("route_search", "provider_info", "general")
+
+# Trained weights, rebuilt with `python -m app.train_query_classifier`
+QUERY_CLASSIFIER_PATH = os.getenv(
+    "QUERY_CLASSIFIER_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'query_classifier.npz')
+)
+
+# Keywords are matched on word boundaries, so "to" no longer matches inside "about"
+ROUTE_KEYWORDS = [
+    'from', 'to', 'route', 'price', 'taka', 'fare', 'cost',
+    'bus', 'buses', 'operate', 'operating', 'providers',
+    'availability', 'schedule', 'available', 'go', 'goes',
+    'cheapest', 'expensive', 'show all', 'list', 'which buses',
+    'travel', 'journey', 'trip'
+]
+PROVIDER_KEYWORDS = [
+    'contact', 'address', 'phone', 'email', 'call', 'number',
+    'privacy', 'policy', 'policies', 'details', 'information',
+    'about', 'tell me about', 'company', 'office', 'location',
+    'refund', 'cancellation', 'baggage', 'discount'
+]
+
+# Letters, digits and the whole Bangla block (its vowel signs aren't \w)
+_WORD_CHARS = r"\wঀ-৿"
+_TOKEN = re.compile(rf"[{_WORD_CHARS}]+")
+
+
+def _alternation(phrases) -> re.Pattern:
+    """
+    One compiled pattern matching any of the phrases as whole words, longest first
+    """
+    ordered = sorted({phrase.lower() for phrase in phrases}, key=len, reverse=True)
+    return re.compile(
+        rf"(?<![{_WORD_CHARS}])(?:{'|'.join(re.escape(phrase) for phrase in ordered)})(?![{_WORD_CHARS}])"
+    )
+
+
+_ROUTE_PATTERN = _alternation(ROUTE_KEYWORDS)
+_PROVIDER_PATTERN = _alternation(PROVIDER_KEYWORDS)
+
+
+def keyword_scores(question: str) -> tuple:
+    """
+    (route keyword hits, provider keyword hits) on word boundaries
+    """
+    text = question.lower()
+    return len(_ROUTE_PATTERN.findall(text)), len(_PROVIDER_PATTERN.findall(text))
+
+
+# Question start/end markers inside a joined batch; underscores are stripped from input first
+_START, _END = "__s__", "__e__"
+# Multiplier mixing two token hashes into a bigram hash
+_BIGRAM_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _entity_tables() -> tuple:
+    """
+    District and provider names as token sequences: one-token names map straight
+    to their placeholder, longer names are indexed by their first token (longest first)
+    """
+    single, multi = {}, {}
+    names = [(name, "__district__") for name in chain(DISTRICT_ALIASES, chain.from_iterable(DISTRICT_ALIASES.values()))]
+    # Provider names win over district names
+    names += [(name, "__provider__") for name in chain(
+        PROVIDER_ALIASES,
+        chain.from_iterable(PROVIDER_ALIASES.values()),
+        (name.replace(" ", "") for name in PROVIDER_ALIASES)
+    )]
+    for name, placeholder in names:
+        tokens = tuple(_TOKEN.findall(name.lower()))
+        if len(tokens) == 1:
+            single[tokens[0]] = placeholder
+        elif tokens:
+            multi.setdefault(tokens[0], {})[tokens] = placeholder
+    for first, phrases in multi.items():
+        multi[first] = sorted(phrases.items(), key=lambda item: len(item[0]), reverse=True)
+    return single, multi
+
+
+_SINGLE_ENTITIES, _MULTI_ENTITIES = _entity_tables()
+
+
+def _normalized_tokens(questions: list) -> list:
+    """
+    Tokens of all questions, each framed by start/end markers, lowercased, with
+    district and provider names replaced by placeholders and numbers by
+    __num__ so the model generalizes over entities. The batch is tokenized with
+    one regex pass; entities are then dictionary lookups per token.
+    """
+    text = " ".join(f"{_START} {question.replace('_', ' ')} {_END}" for question in questions).lower()
+    tokens = _TOKEN.findall(text)
+
+    # Multi-word names first, spliced in order so the list is rebuilt once
+    starts = [i for i, token in enumerate(tokens) if token in _MULTI_ENTITIES]
+    if starts:
+        spliced, position = [], 0
+        for i in starts:
+            if i < position:
+                continue
+            for phrase, placeholder in _MULTI_ENTITIES[tokens[i]]:
+                if tuple(tokens[i:i + len(phrase)]) == phrase:
+                    spliced.extend(tokens[position:i])
+                    spliced.append(placeholder)
+                    position = i + len(phrase)
+                    break
+        spliced.extend(tokens[position:])
+        tokens = spliced
+
+    single = _SINGLE_ENTITIES.get
+    return [single(token) or ("__num__" if token.isdigit() else token) for token in tokens]
+
+
+def tokenize(question: str) -> list:
+    """
+    Normalized tokens of a question, without the start/end markers
+    """
+    return _normalized_tokens([question])[1:-1]
+
+
+class QueryClassifier:
+    """
+    Multinomial logistic regression over hashed word unigrams and bigrams.
+    Weights are a (buckets x classes) NumPy matrix. A batch is tokenized in one
+    pass, token hashes are computed once per distinct token, and bigram
+    hashing and scoring are vectorized over the whole batch.
+    """
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: tuple = QUERY_TYPES):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.labels = tuple(labels)
+        self.buckets = self.weights.shape[0]
+        self._token_hashes = {}
+
+    @classmethod
+    def load(cls, path: str = QUERY_CLASSIFIER_PATH) -> "QueryClassifier":
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], tuple(str(label) for label in data["labels"]))
+
+    def save(self, path: str = QUERY_CLASSIFIER_PATH):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    def _hash_token(self, token: str) -> int:
+        # crc32 rather than hash(): stable across processes, so shipped weights line up
+        if len(self._token_hashes) > 500_000:
+            self._token_hashes.clear()
+        value = self._token_hashes[token] = zlib.crc32(token.encode("utf-8"))
+        return value
+
+    def features(self, questions: list) -> tuple:
+        """
+        Sparse feature matrix of a batch as (row ids, bucket ids) arrays:
+        every token but the end marker as a unigram, every adjacent pair within
+        a question as a bigram. Every question has at least its start marker.
+        """
+        tokens = _normalized_tokens(questions)
+        lookup = self._token_hashes.get
+        hashes = np.fromiter(
+            (lookup(token) or self._hash_token(token) for token in tokens), dtype=np.uint64, count=len(tokens)
+        )
+        is_start = np.fromiter((token == _START for token in tokens), dtype=bool, count=len(tokens))
+        is_end = np.fromiter((token == _END for token in tokens), dtype=bool, count=len(tokens))
+        rows = np.cumsum(is_start) - 1
+
+        unigrams = ~is_end
+        # Pairs (i, i+1) that don't cross from one question's end into the next
+        bigrams = ~is_end[:-1]
+        bigram_hashes = (hashes[:-1][bigrams] * _BIGRAM_MIX) ^ hashes[1:][bigrams]
+
+        buckets = np.uint64(self.buckets)
+        feature_rows = np.concatenate((rows[unigrams], rows[:-1][bigrams]))
+        feature_buckets = np.concatenate((hashes[unigrams] % buckets, bigram_hashes % buckets)).astype(np.int64)
+        return feature_rows, feature_buckets
+
+    def logits(self, questions: list) -> np.ndarray:
+        rows, buckets = self.features(questions)
+        gathered = self.weights[buckets]
+        return np.stack([
+            np.bincount(rows, weights=gathered[:, label], minlength=len(questions))
+            for label in range(len(self.labels))
+        ], axis=1) + self.bias
+
+    def predict_proba_batch(self, questions: list) -> np.ndarray:
+        """
+        Class probabilities for each question, shape (len(questions), len(labels))
+        """
+        if not questions:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        logits = self.logits(questions)
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def classify_batch(self, questions: list) -> list:
+        """
+        Query type for each question
+        """
+        if not questions:
+            return []
+        return [self.labels[i] for i in self.logits(questions).argmax(axis=1)]
+
+    def classify(self, question: str) -> str:
+        return self.classify_batch([question])[0]
+
+
+class KeywordClassifier:
+    """
+    Word-boundary keyword scoring, used when no trained weights are available
+    """
+
+    labels = QUERY_TYPES
+
+    def classify(self, question: str) -> str:
+        route_score, provider_score = keyword_scores(question)
+        if route_score > provider_score:
+            return 'route_search'
+        elif provider_score > 0:
+            return 'provider_info'
+        return 'general'
+
+    def classify_batch(self, questions: list) -> list:
+        return [self.classify(question) for question in questions]
+
+    def predict_proba_batch(self, questions: list) -> np.ndarray:
+        probabilities = np.zeros((len(questions), len(self.labels)), dtype=np.float32)
+        for row, label in enumerate(self.classify_batch(questions)):
+            probabilities[row, self.labels.index(label)] = 1.0
+        return probabilities
+
+
+# Global classifier instance, loaded once
+query_classifier = None
+
+
+def get_query_classifier():
+    """
+    Get the trained classifier, or the keyword classifier if the weights can't be loaded
+    """
+    global query_classifier
+    if query_classifier is None:
+        try:
+            query_classifier = QueryClassifier.load()
+            logger.info(f"Query classifier loaded from {QUERY_CLASSIFIER_PATH}")
+        except Exception as e:
+            logger.warning(f"Query classifier weights not loaded, using keyword rules: {e}")
+            query_classifier = KeywordClassifier()
+    return query_classifier
+
+
+if __name__ == "__main__":
+    # Label questions, one per line: python -m app.query_classifier < questions.txt > labelled.tsv
+    questions = [line.rstrip("\n") for line in sys.stdin if line.strip()]
+    for question, label in zip(questions, get_query_classifier().classify_batch(questions)):
+        print(f"{label}\t{question}")
@@ -1,15 +1,37 @@
 import os
-from openai import OpenAI
+import asyncio
+import threading
+from openai import OpenAI, AsyncOpenAI
 from sqlalchemy.orm import Session
-from sqlalchemy import func  
-from .models import BusProvider, District, DroppingPoint, provider_coverage
-from .rag_pipeline import get_rag_pipeline
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal
+from .rag_pipeline import get_rag_pipeline, LLM_BASE_URL
+from .route_index import get_route_index, get_route_index_async
+from .answer_cache import get_answer_cache, normalize_question, question_entities, ANSWER_CACHE_ENABLED
+from .param_extractor import get_param_extractor, PARAM_EXTRACTOR_MIN_CONFIDENCE
+from .metrics import stage, llm_call, ASK_REQUESTS, ASK_COALESCED
+from .single_flight import SingleFlight
+from .query_classifier import get_query_classifier, keyword_scores
 import logging
 import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RESPONSE_ERROR = "Sorry, I encountered an error generating a response."
+
+# Model for parameter extraction and the final natural language response
+ROUTER_MODEL = "openai/gpt-oss-20b:free"
+
+# How provider questions are answered:
+# "single"   - the RAG answer is returned as is (one LLM call)
+# "template" - contact/address lookups are answered from the documents without an LLM, otherwise "single"
+# "two_step" - the RAG answer is rephrased by a second completion
+PROVIDER_ANSWER_MODE = os.getenv("PROVIDER_ANSWER_MODE", "single").lower()
+
+# Most route results (cheapest first) put in a route search answer
+ROUTE_RESULTS_LIMIT = int(os.getenv("ROUTE_RESULTS_LIMIT", "50"))
+
 
 class QueryRouter:
     def __init__(self):
@@ -17,52 +39,43 @@ class QueryRouter:
         if not self.llm_api_key:
             logger.warning("llm_API_KEY not set.")
         else:
-            self.client = OpenAI(api_key=self.llm_api_key, base_url="https://openrouter.ai/api/v1")
+            self.client = OpenAI(api_key=self.llm_api_key, base_url=LLM_BASE_URL)
+            self.async_client = AsyncOpenAI(api_key=self.llm_api_key, base_url=LLM_BASE_URL)
         
         self.rag_pipeline = get_rag_pipeline()
+        self.answer_cache = get_answer_cache()
+        # Identical questions asked concurrently share one computation
+        self.single_flight = SingleFlight(on_coalesced=ASK_COALESCED.inc)
     
     def classify_query(self, question: str) -> str:
         """
-        Classify the query type using keyword matching
+        Classify the query type with the trained query classifier
         Returns: 'route_search', 'provider_info', or 'general'
         """
-        question_lower = question.lower()
-        
-        # Route search keywords
-        route_keywords = [
-            'from', 'to', 'route', 'price', 'taka', 'fare', 'cost',
-            'bus', 'buses', 'operate', 'operating', 'providers',
-            'availability', 'schedule', 'available', 'go', 'goes',
-            'cheapest', 'expensive', 'show all', 'list', 'which buses',
-            'travel', 'journey', 'trip'
-        ]
-        
-        # Provider info keywords
-        provider_keywords = [
-            'contact', 'address', 'phone', 'email', 'call', 'number',
-            'privacy', 'policy', 'policies', 'details', 'information',
-            'about', 'tell me about', 'company', 'office', 'location',
-            'refund', 'cancellation', 'baggage', 'discount'
-        ]
-        
-        # Check for route search
-        route_score = sum(1 for keyword in route_keywords if keyword in question_lower)
-        provider_score = sum(1 for keyword in provider_keywords if keyword in question_lower)
-        
-        logger.info(f"Classification scores - route: {route_score}, provider: {provider_score}")
-        
-        if route_score > provider_score:
-            return 'route_search'
-        elif provider_score > 0:
-            return 'provider_info'
-        else:
-            return 'general'
+        with stage("classify"):
+            query_type = get_query_classifier().classify(question)
+        
+        logger.info(f"Classified as {query_type}")
+        return query_type
     
-    def search_routes(self, question: str, db: Session) -> dict:
+    def _score_query(self, question: str) -> tuple:
         """
-        Extract search parameters from natural language and query database
+        Keyword scores for the route search and provider info query types
+        """
+        return keyword_scores(question)
+    
+    def is_ambiguous(self, question: str) -> bool:
+        """
+        True when a question scores (nearly) as high for route search as for provider info
         """
-        prompt = f"""Extract bus search parameters from this question. Return a JSON object with these fields:
+        route_score, provider_score = self._score_query(question)
+        return route_score > 0 and provider_score > 0 and abs(route_score - provider_score) <= 1
+    
+    def _extraction_prompt(self, question: str) -> str:
+        """
+        Prompt asking the LLM to extract route search parameters
+        """
+        return f"""Extract bus search parameters from this question. Return a JSON object with these fields:
 - from_district: origin district name (or null if not specified)
 - to_district: destination district name (or null if not specified)  
 - max_price: maximum price in taka (or null if not specified)
@@ -72,85 +85,130 @@ Available districts: Dhaka, Chattogram, Khulna, Rajshahi, Sylhet, Barishal, Rang
 Question: {question}
 
 Return ONLY valid JSON, no explanation. Example: {{"from_district": "Dhaka", "to_district": "Rajshahi", "max_price": 500}}"""
+    
+    def _parse_params(self, response_text: str) -> dict:
+        """
+        Parse the JSON parameters returned by the extraction LLM call
+        """
+        logger.info(f"Parameter extraction response: {response_text}")
         
-        try:
-            response1 = self.client.chat.completions.create(
-                model="openai/gpt-oss-20b:free",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200
-            )
+        # Remove markdown code blocks if present
+        if response_text.startswith('```'):
+            lines = response_text.split('\n')
+            response_text = '\n'.join(lines[1:-1]) if len(lines) > 2 else response_text
+            if response_text.startswith('json'):
+                response_text = response_text[4:].strip()
+        
+        params = json.loads(response_text.strip())
+        logger.info(f"Extracted parameters: {params}")
+        return params
+    
+    def _local_params(self, question: str, index):
+        """
+        Extract route parameters without the LLM; None if the extractor isn't confident
+        """
+        with stage("param_extraction"):
+            params, confidence = get_param_extractor(index).extract(question)
+        logger.info(f"Local parameter extraction (confidence {confidence:.2f}): {params}")
+        return params if confidence >= PARAM_EXTRACTOR_MIN_CONFIDENCE else None
+    
+    def _find_routes(self, params: dict, index) -> dict:
+        """
+        Look up routes matching the extracted parameters in the route index
+        """
+        from_district = params.get('from_district')
+        to_district = params.get('to_district')
+        max_price = params.get('max_price')
+        
+        results = []
+        total = 0
+        
+        if from_district and to_district:
+            from_id = index.get_district_id(from_district)
+            to_id = index.get_district_id(to_district)
             
-            response_text = response1.choices[0].message.content.strip()
-            logger.info(f"Parameter extraction response: {response_text}")
+            logger.info(f"Found districts - From: {from_id}, To: {to_id}")
             
-            # Remove markdown code blocks if present
-            if response_text.startswith('```'):
-                lines = response_text.split('\n')
-                response_text = '\n'.join(lines[1:-1]) if len(lines) > 2 else response_text
-                if response_text.startswith('json'):
-                    response_text = response_text[4:].strip()
+            if from_id is not None and to_id is not None:
+                # Only the cheapest rows are built; the full product can be thousands
+                total = index.count(from_id, to_id, max_price)
+                rows = index.iter_search(from_id, to_id, max_price, sort_by="price", stop=ROUTE_RESULTS_LIMIT)
+                for provider, drop_point, price in rows:
+                    results.append({
+                        'provider': provider,
+                        'from': from_district,
+                        'to': to_district,
+                        'drop_point': drop_point,
+                        'price': price
+                    })
+                
+                logger.info(f"Total results: {total}")
+            else:
+                logger.warning(f"Districts not found - from_dist: {from_id}, to_dist: {to_id}")
+        else:
+            logger.warning(f"Missing parameters - from: {from_district}, to: {to_district}")
+        
+        return {
+            'found': len(results) > 0,
+            'results': results,
+            'total': total,
+            'params': params
+        }
+    
+    def search_routes(self, question: str, db: Session) -> dict:
+        """
+        Extract search parameters from natural language and query database
+        """
+        response_text = ''
+        try:
+            index = get_route_index(db)
+            params = self._local_params(question, index)
             
-            params = json.loads(response_text.strip())
-            logger.info(f"Extracted parameters: {params}")
+            # Fall back to the LLM only when local extraction is unsure
+            if params is None:
+                with stage("llm_extraction"), llm_call(ROUTER_MODEL, "param_extraction") as call:
+                    response1 = call.response = self.client.chat.completions.create(
+                        model=ROUTER_MODEL,
+                        messages=[{"role": "user", "content": self._extraction_prompt(question)}],
+                        max_tokens=200
+                    )
+                
+                response_text = response1.choices[0].message.content.strip()
+                params = self._parse_params(response_text)
             
-            from_district = params.get('from_district')
-            to_district = params.get('to_district')
-            max_price = params.get('max_price')
+            with stage("route_lookup"):
+                return self._find_routes(params, index)
             
-            # Query database
-            results = []
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON decode error: {e}, Response was: {response_text}")
+            return {'found': False, 'results': [], 'params': {}, 'error': 'Failed to parse parameters'}
+        except Exception as e:
+            logger.error(f"Error searching routes: {e}", exc_info=True)
+            return {'found': False, 'results': [], 'params': {}, 'error': str(e)}
+    
+    async def search_routes_async(self, question: str, db: AsyncSession) -> dict:
+        """
+        Async version of search_routes
+        """
+        response_text = ''
+        try:
+            index = await get_route_index_async(db)
+            params = self._local_params(question, index)
             
-            if from_district and to_district:
-                # Find districts
-                from_dist = db.query(District).filter(District.name == from_district).first()
-                to_dist = db.query(District).filter(District.name == to_district).first()
-                
-                logger.info(f"Found districts - From: {from_dist}, To: {to_dist}")
-                
-                if from_dist and to_dist:
-                    # Find providers covering both districts - FIXED: using func directly
-                    providers = db.query(BusProvider).join(
-                        provider_coverage, BusProvider.id == provider_coverage.c.provider_id
-                    ).filter(
-                        provider_coverage.c.district_id.in_([from_dist.id, to_dist.id])
-                    ).group_by(BusProvider.id).having(
-                        func.count(provider_coverage.c.district_id) == 2  # ← FIXED
-                    ).all()
-                    
-                    logger.info(f"Found {len(providers)} providers covering both districts")
-                    
-                    # Get dropping points
-                    dropping_points_query = db.query(DroppingPoint).filter(
-                        DroppingPoint.district_id == to_dist.id
+            # Fall back to the LLM only when local extraction is unsure
+            if params is None:
+                with stage("llm_extraction"), llm_call(ROUTER_MODEL, "param_extraction") as call:
+                    response1 = call.response = await self.async_client.chat.completions.create(
+                        model=ROUTER_MODEL,
+                        messages=[{"role": "user", "content": self._extraction_prompt(question)}],
+                        max_tokens=200
                     )
-                    
-                    if max_price:
-                        dropping_points_query = dropping_points_query.filter(DroppingPoint.price <= max_price)
-                    
-                    dropping_points = dropping_points_query.all()
-                    logger.info(f"Found {len(dropping_points)} dropping points")
-                    
-                    for provider in providers:
-                        for dp in dropping_points:
-                            results.append({
-                                'provider': provider.name,
-                                'from': from_district,
-                                'to': to_district,
-                                'drop_point': dp.name,
-                                'price': dp.price
-                            })
-                    
-                    logger.info(f"Total results: {len(results)}")
-                else:
-                    logger.warning(f"Districts not found - from_dist: {from_dist}, to_dist: {to_dist}")
-            else:
-                logger.warning(f"Missing parameters - from: {from_district}, to: {to_district}")
+                
+                response_text = response1.choices[0].message.content.strip()
+                params = self._parse_params(response_text)
             
-            return {
-                'found': len(results) > 0,
-                'results': results,
-                'params': params
-            }
+            with stage("route_lookup"):
+                return self._find_routes(params, index)
             
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {e}, Response was: {response_text}")
@@ -159,9 +217,9 @@ Return ONLY valid JSON, no explanation. Example: {{"from_district": "Dhaka", "to
             logger.error(f"Error searching routes: {e}", exc_info=True)
             return {'found': False, 'results': [], 'params': {}, 'error': str(e)}
     
-    def generate_natural_response(self, question: str, data: dict, query_type: str) -> str:
+    def _fallback_response(self, data: dict, query_type: str):
         """
-        Generate natural language response
+        Response that doesn't need the LLM (errors, missing API key), or None
         """
         # FIXED: Check for errors first
         if 'error' in data:
@@ -170,7 +228,11 @@ Return ONLY valid JSON, no explanation. Example: {{"from_district": "Dhaka", "to
         if not self.llm_api_key:
             if query_type == 'route_search' and data.get('found'):
                 results = data['results']
-                response = f"Found {len(results)} bus(es):\n"
+                total = data.get('total', len(results))
+                if total > len(results):
+                    response = f"Found {total} bus(es), the {len(results)} cheapest of {total}:\n"
+                else:
+                    response = f"Found {total} bus(es):\n"
                 for r in results:
                     response += f"- {r['provider']}: {r['from']} → {r['to']} at {r['drop_point']} for ৳{r['price']}\n"
                 return response
@@ -179,6 +241,12 @@ Return ONLY valid JSON, no explanation. Example: {{"from_district": "Dhaka", "to
             else:
                 return "API key not configured."
         
+        return None
+    
+    def _response_prompt(self, question: str, data: dict, query_type: str) -> str:
+        """
+        Prompt for the final natural language response
+        """
         if query_type == 'route_search':
             if data.get('found'):
                 # FIXED: Use ACTUAL data from database
@@ -187,8 +255,11 @@ Return ONLY valid JSON, no explanation. Example: {{"from_district": "Dhaka", "to
                     f"- {r['provider']}: {r['from']} to {r['to']} (Drop: {r['drop_point']}, Price: ৳{r['price']})"
                     for r in results
                 ])
+                total = data.get('total', len(results))
+                if total > len(results):
+                    results_text += f"\n(the {len(results)} cheapest of {total} results)"
                 
-                prompt = f"""The user asked: "{question}"
+                return f"""The user asked: "{question}"
 
 Database query results (REAL DATA):
 {results_text}
@@ -196,7 +267,7 @@ Database query results (REAL DATA):
 Provide a helpful response using ONLY the information above. List the buses with their exact prices and drop points. Do not make up any information."""
             else:
                 params = data.get('params', {})
-                prompt = f"""The user asked: "{question}"
+                return f"""The user asked: "{question}"
 
 Search parameters: {params}
 
@@ -206,7 +277,7 @@ NO buses were found in the database matching these criteria. Explain this clearl
 - Checking if the route exists"""
         
         elif query_type == 'provider_info':
-            prompt = f"""The user asked: "{question}"
+            return f"""The user asked: "{question}"
 
 Information found:
 {data.get('answer', 'No information found.')}
@@ -216,27 +287,218 @@ Sources: {', '.join(data.get('sources', []))}
 Provide a helpful response based ONLY on the information above."""
         
         else:
-            prompt = f"""The user asked: "{question}"
+            return f"""The user asked: "{question}"
 
 Provide a brief, helpful response about the bus booking system. Keep it short and friendly."""
+    
+    def generate_natural_response(self, question: str, data: dict, query_type: str) -> str:
+        """
+        Generate natural language response
+        """
+        fallback = self._fallback_response(data, query_type)
+        if fallback is not None:
+            return fallback
         
         try:
-            response3 = self.client.chat.completions.create(
-                model="openai/gpt-oss-20b:free",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500
-            )
+            with stage("natural_response"), llm_call(ROUTER_MODEL, "natural_response") as call:
+                response3 = call.response = self.client.chat.completions.create(
+                    model=ROUTER_MODEL,
+                    messages=[{"role": "user", "content": self._response_prompt(question, data, query_type)}],
+                    max_tokens=500
+                )
             return response3.choices[0].message.content
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return "Sorry, I encountered an error generating a response."
+            return RESPONSE_ERROR
+    
+    async def generate_natural_response_async(self, question: str, data: dict, query_type: str) -> str:
+        """
+        Async version of generate_natural_response
+        """
+        fallback = self._fallback_response(data, query_type)
+        if fallback is not None:
+            return fallback
+        
+        try:
+            with stage("natural_response"), llm_call(ROUTER_MODEL, "natural_response") as call:
+                response3 = call.response = await self.async_client.chat.completions.create(
+                    model=ROUTER_MODEL,
+                    messages=[{"role": "user", "content": self._response_prompt(question, data, query_type)}],
+                    max_tokens=500
+                )
+            return response3.choices[0].message.content
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return RESPONSE_ERROR
+    
+    async def generate_natural_response_stream(self, question: str, data: dict, query_type: str):
+        """
+        Streaming version of generate_natural_response, yields text chunks
+        """
+        fallback = self._fallback_response(data, query_type)
+        if fallback is not None:
+            yield fallback
+            return
+        
+        try:
+            with stage("natural_response"), llm_call(ROUTER_MODEL, "natural_response_stream"):
+                stream = await self.async_client.chat.completions.create(
+                    model=ROUTER_MODEL,
+                    messages=[{"role": "user", "content": self._response_prompt(question, data, query_type)}],
+                    max_tokens=500,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            yield RESPONSE_ERROR
+    
+    def _cache_generation(self, index) -> tuple:
+        """
+        Cached answers are valid for one provider document version and one reference
+        data version, both persisted so a reindex or reseed in any process retires them
+        """
+        return (self.rag_pipeline.index_version, index.version)
+    
+    def _cache_entities(self, normalized: str, index) -> frozenset:
+        """
+        Provider and district names (plus numbers) a question mentions
+        """
+        return question_entities(normalized, index.provider_names + list(index.district_ids))
+    
+    def _embed_for_cache(self, question: str):
+        """
+        Query embedding for near-duplicate lookups; None if embedding fails
+        """
+        try:
+            return self.rag_pipeline.embed_query(question)
+        except Exception as e:
+            logger.warning(f"Could not embed question for answer cache: {e}")
+            return None
+    
+    def _needs_embedding(self, question: str, query_type: str) -> bool:
+        """
+        Whether a cache miss embeds the question for the near-duplicate lookup.
+        Route searches never do, nor do questions the provider or lexical fast
+        path answers: those make no embedding call at all and are only served
+        from the exact-match cache.
+        """
+        return query_type != 'route_search' and self.rag_pipeline.needs_vector_search(question)
+    
+    def _is_cacheable(self, result: dict) -> bool:
+        """
+        Don't cache answers produced from errors
+        """
+        answer = result.get('answer') or ''
+        return not result.get('error') and RESPONSE_ERROR not in answer and not answer.startswith("Error")
+    
+    def _cache_lookup(self, question: str, db: Session) -> tuple:
+        """
+        Look a question up in the answer cache.
+        Returns (cached_result or None, cache context for _cache_store)
+        """
+        index = get_route_index(db)
+        ctx = self._cache_context(question, index)
+        
+        cached = self.answer_cache.get(ctx['normalized'], ctx['generation'])
+        if cached is not None:
+            logger.info(f"Answer cache hit: {ctx['normalized']}")
+            return cached, ctx
+        
+        if self._needs_embedding(question, ctx['query_type']):
+            ctx['embedding'] = self._embed_for_cache(question)
+            cached = self._cache_get_similar(ctx)
+            if cached is not None:
+                return cached, ctx
+        
+        self.answer_cache.record_miss()
+        return None, ctx
+    
+    async def _cache_lookup_async(self, question: str, db: AsyncSession) -> tuple:
+        """
+        Async version of _cache_lookup
+        """
+        index = await get_route_index_async(db)
+        ctx = self._cache_context(question, index)
+        
+        cached = self.answer_cache.get(ctx['normalized'], ctx['generation'])
+        if cached is not None:
+            logger.info(f"Answer cache hit: {ctx['normalized']}")
+            return cached, ctx
+        
+        if self._needs_embedding(question, ctx['query_type']):
+            ctx['embedding'] = await asyncio.to_thread(self._embed_for_cache, question)
+            cached = self._cache_get_similar(ctx)
+            if cached is not None:
+                return cached, ctx
+        
+        self.answer_cache.record_miss()
+        return None, ctx
+    
+    def _cache_context(self, question: str, index) -> dict:
+        normalized = normalize_question(question)
+        return {
+            'normalized': normalized,
+            'generation': self._cache_generation(index),
+            'entities': self._cache_entities(normalized, index),
+            'query_type': self.classify_query(question),
+            'embedding': None
+        }
+    
+    def _cache_get_similar(self, ctx: dict):
+        return self.answer_cache.get_similar(ctx['embedding'], ctx['query_type'], ctx['entities'], ctx['generation'])
+    
+    def _cache_store(self, ctx: dict, result: dict):
+        if self._is_cacheable(result):
+            self.answer_cache.put(
+                ctx['normalized'], result, result['type'], ctx['generation'], ctx['embedding'], ctx['entities']
+            )
+    
+    def _flight_key(self, question: str) -> tuple:
+        """
+        Requests with the same normalized question against the same document index share an answer
+        """
+        return (normalize_question(question), self.rag_pipeline.index_version)
+    
+    async def _refresh_index_version_async(self):
+        """
+        refresh_index_version off the event loop, only when a re-check is due
+        """
+        if self.rag_pipeline.index_version_due():
+            await asyncio.to_thread(self.rag_pipeline.refresh_index_version)
     
     def answer_question(self, question: str, db: Session) -> dict:
         """
-        Main method to answer any question
+        Main method to answer any question, served from the answer cache when possible.
+        Concurrent identical questions are computed once.
+        """
+        self.rag_pipeline.refresh_index_version()
+        return self.single_flight.do(self._flight_key(question), lambda: self._answer_question(question, db))
+    
+    def _answer_question(self, question: str, db: Session) -> dict:
+        with stage("total"):
+            if not ANSWER_CACHE_ENABLED:
+                result = self._answer(question, db, self.classify_query(question))
+                ASK_REQUESTS.inc(query_type=result['type'], cached="false")
+                return result
+            
+            with stage("cache_lookup"):
+                cached, ctx = self._cache_lookup(question, db)
+            if cached is not None:
+                ASK_REQUESTS.inc(query_type=cached['type'], cached="true")
+                return cached
+            
+            result = self._answer(question, db, ctx['query_type'], ctx['embedding'])
+            self._cache_store(ctx, result)
+            ASK_REQUESTS.inc(query_type=result['type'], cached="false")
+            return result
+    
+    def _answer(self, question: str, db: Session, query_type: str, query_embedding=None) -> dict:
+        """
+        Answer a classified question without the cache
         """
-        # Classify the query
-        query_type = self.classify_query(question)
         logger.info(f"Query classified as: {query_type}")
         
         if query_type == 'route_search':
@@ -249,13 +511,21 @@ Provide a brief, helpful response about the bus booking system. Keep it short an
             return {
                 'answer': answer,
                 'type': 'route_search',
-                'data': search_data['results'] if search_data.get('found') else []
+                'data': search_data['results'] if search_data.get('found') else [],
+                'error': search_data.get('error')
             }
         
         elif query_type == 'provider_info':
+            templated = self._template_result(question, query_type)
+            if templated is not None:
+                return templated
+            
             # Use RAG for provider information
-            rag_result = self.rag_pipeline.ask(question)
-            answer = self.generate_natural_response(question, rag_result, query_type)
+            rag_result = self.rag_pipeline.ask(question, query_embedding=query_embedding)
+            if PROVIDER_ANSWER_MODE == 'two_step':
+                answer = self.generate_natural_response(question, rag_result, query_type)
+            else:
+                answer = rag_result['answer']
             
             return {
                 'answer': answer,
@@ -270,15 +540,193 @@ Provide a brief, helpful response about the bus booking system. Keep it short an
                 'answer': answer,
                 'type': 'general'
             }
+    
+    async def answer_question_async(self, question: str) -> dict:
+        """
+        Async version of answer_question. The shared computation outlives a
+        cancelled caller (e.g. a client disconnect), so it must not use any
+        one request's resources: only the question goes into the flight and
+        the computation opens its own database session.
+        """
+        await self._refresh_index_version_async()
+        return await self.single_flight.do_async(
+            self._flight_key(question), lambda: self._answer_question_shared(question)
+        )
+    
+    async def _answer_question_shared(self, question: str) -> dict:
+        async with AsyncSessionLocal() as db:
+            return await self._answer_question_async(question, db)
+    
+    async def _answer_question_async(self, question: str, db: AsyncSession) -> dict:
+        with stage("total"):
+            if not ANSWER_CACHE_ENABLED:
+                result = await self._answer_async(question, db, self.classify_query(question))
+                ASK_REQUESTS.inc(query_type=result['type'], cached="false")
+                return result
+            
+            with stage("cache_lookup"):
+                cached, ctx = await self._cache_lookup_async(question, db)
+            if cached is not None:
+                ASK_REQUESTS.inc(query_type=cached['type'], cached="true")
+                return cached
+            
+            result = await self._answer_async(question, db, ctx['query_type'], ctx['embedding'])
+            self._cache_store(ctx, result)
+            ASK_REQUESTS.inc(query_type=result['type'], cached="false")
+            return result
+    
+    async def _answer_async(self, question: str, db: AsyncSession, query_type: str, query_embedding=None) -> dict:
+        """
+        Answer a classified question without the cache
+        """
+        templated = self._template_result(question, query_type)
+        if templated is not None:
+            return templated
+        
+        result, data = await self._retrieve_async(question, db, query_type, query_embedding)
+        if result['type'] == 'provider_info' and PROVIDER_ANSWER_MODE != 'two_step':
+            result['answer'] = (await self.rag_pipeline.ask_async(question, context=data))['answer']
+            return result
+        
+        data = await self._generation_input_async(question, result['type'], data)
+        result['answer'] = await self.generate_natural_response_async(question, data, result['type'])
+        return result
+    
+    def _template_result(self, question: str, query_type: str):
+        """
+        In template mode, the answer to a provider contact/address lookup built
+        without any LLM call, or None
+        """
+        if PROVIDER_ANSWER_MODE != 'template' or query_type != 'provider_info':
+            return None
+        templated = self.rag_pipeline.template_answer(question)
+        if templated is None:
+            return None
+        logger.info("Provider lookup answered from template")
+        return {'answer': templated['answer'], 'type': 'provider_info', 'sources': templated['sources']}
+    
+    async def _retrieve_async(self, question: str, db: AsyncSession, query_type: str, query_embedding=None) -> tuple:
+        """
+        Run the lookup stage for a classified question.
+        Returns (result fields known before generation, data for the generation stage).
+        For ambiguous questions, route parameter extraction and RAG context
+        retrieval run concurrently; the route answer wins if it found buses.
+        """
+        logger.info(f"Query classified as: {query_type}")
+        
+        search_data = None
+        context = None
+        
+        if query_type != 'general' and self.is_ambiguous(question):
+            logger.info("Ambiguous query, running route search and context retrieval concurrently")
+            search_data, context = await asyncio.gather(
+                self.search_routes_async(question, db),
+                self.rag_pipeline.retrieve_relevant_context_async(
+                    question, n_results=5, query_embedding=query_embedding
+                )
+            )
+            query_type = 'route_search' if search_data.get('found') else 'provider_info'
+        
+        if query_type == 'route_search':
+            if search_data is None:
+                search_data = await self.search_routes_async(question, db)
+            logger.info(f"Search results: found={search_data.get('found')}, count={len(search_data.get('results', []))}")
+            
+            return {
+                'type': 'route_search',
+                'data': search_data['results'] if search_data.get('found') else [],
+                'error': search_data.get('error')
+            }, search_data
+        
+        elif query_type == 'provider_info':
+            if context is None:
+                context = await self.rag_pipeline.retrieve_relevant_context_async(
+                    question, n_results=5, query_embedding=query_embedding
+                )
+            
+            return {
+                'type': 'provider_info',
+                'sources': list(set([meta['provider'] for meta in context[1]]))
+            }, context
+        
+        else:
+            return {'type': 'general'}, {}
+    
+    async def _generation_input_async(self, question: str, query_type: str, data):
+        """
+        Data the final response is generated from; for provider questions this
+        runs the RAG answer step over the retrieved context
+        """
+        if query_type == 'provider_info':
+            return await self.rag_pipeline.ask_async(question, context=data)
+        return data
+    
+    async def _generate_stream(self, question: str, query_type: str, data):
+        """
+        Stream the answer text for retrieved data: provider answers come straight
+        from the RAG model unless the mode is two_step
+        """
+        if query_type == 'provider_info' and PROVIDER_ANSWER_MODE != 'two_step':
+            context_docs, context_metadata = data
+            async for text in self.rag_pipeline.generate_answer_stream(question, context_docs, context_metadata):
+                yield text
+            return
+        
+        data = await self._generation_input_async(question, query_type, data)
+        async for text in self.generate_natural_response_stream(question, data, query_type):
+            yield text
+    
+    async def answer_question_stream(self, question: str, db: AsyncSession):
+        """
+        Streaming version of answer_question_async. Yields (event, payload) pairs:
+        'meta' with the query type, sources and route results as soon as they are
+        known, 'token' with answer text as the LLM produces it, then 'done'.
+        """
+        await self._refresh_index_version_async()
+        ctx = None
+        if ANSWER_CACHE_ENABLED:
+            with stage("cache_lookup"):
+                cached, ctx = await self._cache_lookup_async(question, db)
+            if cached is not None:
+                ASK_REQUESTS.inc(query_type=cached['type'], cached="true")
+                yield 'meta', {key: value for key, value in cached.items() if key != 'answer'}
+                yield 'token', {'text': cached['answer']}
+                yield 'done', {'cached': True}
+                return
+            query_type, query_embedding = ctx['query_type'], ctx['embedding']
+        else:
+            query_type, query_embedding = self.classify_query(question), None
+        
+        result = self._template_result(question, query_type)
+        if result is not None:
+            yield 'meta', {key: value for key, value in result.items() if key != 'answer'}
+            yield 'token', {'text': result['answer']}
+        else:
+            result, data = await self._retrieve_async(question, db, query_type, query_embedding)
+            yield 'meta', dict(result)
+            
+            parts = []
+            async for text in self._generate_stream(question, result['type'], data):
+                parts.append(text)
+                yield 'token', {'text': text}
+            result['answer'] = ''.join(parts)
+        
+        if ctx is not None:
+            self._cache_store(ctx, result)
+        ASK_REQUESTS.inc(query_type=result['type'], cached="false")
+        yield 'done', {'cached': False}
 
 
 # Global instance
 query_router = None
+_query_router_lock = threading.Lock()
 
 
 def get_query_router() -> QueryRouter:
     """Get or create QueryRouter instance"""
     global query_router
     if query_router is None:
-        query_router = QueryRouter()
+        with _query_router_lock:
+            if query_router is None:
+                query_router = QueryRouter()
     return query_router
\ No newline at end of file
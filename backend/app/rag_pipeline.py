@@ -1,220 +1,542 @@
 import os
-import chromadb
-from chromadb.config import Settings
-from openai import OpenAI
+import re
+import time
+import hashlib
+import threading
+from openai import OpenAI, AsyncOpenAI
+from .vector_store import open_collection, open_async_collection, get_embedding_function, VECTOR_STORE_BACKEND
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .provider_matcher import ProviderMatcher
+from .metrics import stage, llm_call, RAG_PROMPT_TOKENS
+from .context_assembler import assemble_context, estimate_tokens
+from .database import SessionLocal
+from .data_version import get_data_version, bump_data_version, PROVIDER_DOCS
+from .route_index import ROUTE_INDEX_REFRESH_SECONDS
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# "hybrid" (BM25 + vector, fused), "vector" or "lexical"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+
+# OpenAI-compatible chat completions endpoint (OpenRouter unless overridden, e.g. by the benchmark's fake server)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Model that answers provider questions from the retrieved chunks
+RAG_MODEL = "openai/gpt-4o-mini"
+
+# Contact/address lookups answerable from the documents' labelled lines without an LLM
+_CONTACT_WORDS = {"contact", "phone", "number", "numbers", "call", "email", "mobile", "hotline", "counter", "tel"}
+_ADDRESS_WORDS = {"address", "located", "location", "office", "where"}
+# Anything else the user asks about needs the model
+_NON_TEMPLATE_WORDS = {"privacy", "policy", "policies", "refund", "cancellation", "baggage", "discount", "data", "terms"}
+_LABELLED_LINE = re.compile(r"^(Official Address|Contact Information|Privacy Policy / Terms Link):\s*(.+)$", re.MULTILINE)
+
+# Bump when _chunk_file changes so every file is re-chunked on the next index run
+CHUNKER_VERSION = 2
+
+# Directory of provider .txt documents
+PROVIDERS_DIR = os.getenv(
+    "PROVIDERS_DIR",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'providers')
+)
+
+
+def content_hash(content: str) -> str:
+    """
+    Hash of a provider file as chunked by the current chunker
+    """
+    return hashlib.sha256(f"chunker-v{CHUNKER_VERSION}\n{content}".encode('utf-8')).hexdigest()
+
 
 class RAGPipeline:
     def __init__(self):
-        # Initialize ChromaDB client
-        chroma_host = os.getenv("CHROMA_HOST", "localhost")
-        chroma_port = int(os.getenv("CHROMA_PORT", "8000"))
-        
-        self.chroma_client = chromadb.HttpClient(
-            host=chroma_host,
-            port=chroma_port,
-            settings=Settings(anonymized_telemetry=False)
-        )
+        # Async collection is created lazily on first use inside the event loop
+        self.async_collection = None
+        
+        # Same embedding function as the collection, so query embeddings can be reused
+        self.embedding_function = get_embedding_function()
+        
+        # Persisted version of the indexed documents, bumped by whichever process
+        # reindexes them (see refresh_index_version), so cached answers can be dropped
+        self._index_version_lock = threading.Lock()
+        self.index_version = self._read_index_version()
+        self._index_version_checked_at = time.monotonic()
         
-        # Get or create collection
+        # Get or create collection on the configured vector store backend
         try:
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="bus_providers",
-                metadata={"description": "Bus provider information and policies"}
-            )
-            logger.info("ChromaDB collection initialized successfully")
+            self.collection = open_collection(self.embedding_function)
+            logger.info(f"Vector store collection initialized successfully ({VECTOR_STORE_BACKEND})")
         except Exception as e:
-            logger.error(f"Error initializing ChromaDB: {e}")
+            logger.error(f"Error initializing vector store: {e}")
             raise
         
+        # BM25 index and provider-name matcher over the same chunks, rebuilt whenever they change
+        self.lexical_index = None
+        self.provider_matcher = None
+        try:
+            self.build_local_indexes()
+        except Exception as e:
+            logger.warning(f"Local indexes not built, using vector retrieval only: {e}")
+        
         # Initialize OpenRouter client
         self.api_key = os.getenv("xAI_API_KEY")
         if not self.api_key:
             logger.warning("xAI_API_KEY not set. RAG queries will fail.")
         else:
-            self.client = OpenAI(api_key=self.api_key, base_url="https://openrouter.ai/api/v1")
+            self.client = OpenAI(api_key=self.api_key, base_url=LLM_BASE_URL)
+            self.async_client = AsyncOpenAI(api_key=self.api_key, base_url=LLM_BASE_URL)
             logger.info(f"OpenRouter client initialized with key: {self.api_key[:10]}...")
     
-    def index_documents(self, provider_files_dir: str):
+    def _chunk_file(self, file_path: str, content: str) -> tuple:
+        """
+        Split one provider file into chunks.
+        Returns (documents, metadatas, ids)
+        """
+        documents = []
+        metadatas = []
+        ids = []
+        
+        # Extract provider name from filename
+        provider_name = os.path.basename(file_path).replace('.txt', '').replace('_', ' ').title()
+        base_metadata = {
+            "provider": provider_name,
+            "source_file": os.path.basename(file_path),
+            "content_hash": content_hash(content)
+        }
+        
+        # STRATEGY 1: Always index the COMPLETE document (most important)
+        documents.append(content)
+        metadatas.append({**base_metadata, "chunk_type": "complete"})
+        ids.append(f"{provider_name}_complete")
+        
+        # STRATEGY 2: Extract and index KEY SECTIONS separately
+        # Look for common patterns in provider files
+        lines = content.split('\n')
+        
+        # Find and index contact section
+        contact_section = []
+        address_section = []
+        policy_section = []
+        
+        for i, line in enumerate(lines):
+            line_lower = line.lower()
+            
+            # Capture contact information (with context)
+            if 'contact' in line_lower or 'phone' in line_lower or 'email' in line_lower or 'tel:' in line_lower:
+                # Get this line and next 2 lines for complete context
+                contact_section.extend(lines[max(0, i-1):min(len(lines), i+3)])
+            
+            # Capture address
+            if 'address' in line_lower or 'official address' in line_lower:
+                address_section.extend(lines[max(0, i-1):min(len(lines), i+3)])
+            
+            # Capture privacy policy section
+            if 'privacy' in line_lower:
+                policy_section.extend(lines[max(0, i-1):min(len(lines), i+5)])
+        
+        # Index contact section if found
+        if contact_section:
+            contact_text = '\n'.join(dict.fromkeys(contact_section))  # Remove duplicates, keep document order
+            documents.append(contact_text)
+            metadatas.append({**base_metadata, "chunk_type": "contact"})
+            ids.append(f"{provider_name}_contact")
+        
+        # Index address section if found
+        if address_section:
+            address_text = '\n'.join(dict.fromkeys(address_section))
+            documents.append(address_text)
+            metadatas.append({**base_metadata, "chunk_type": "address"})
+            ids.append(f"{provider_name}_address")
+        
+        logger.info(f"Chunked {provider_name}: 1 complete + {len(contact_section) > 0} contact + {len(address_section) > 0} address chunks")
+        
+        return documents, metadatas, ids
+    
+    def index_documents(self, provider_files_dir: str) -> dict:
         """
-        Index all provider documents into ChromaDB
+        Incrementally index provider documents.
+        Each chunk stores its source file's content hash; only new or changed files
+        are re-embedded and upserted, and chunks of removed files are deleted (all
+        of them once the directory has no files left; a missing directory changes
+        nothing). Returns a report of what changed.
         """
         import glob
         
-        provider_files = glob.glob(os.path.join(provider_files_dir, "*.txt"))
+        report = {
+            "added": [],
+            "updated": [],
+            "removed": [],
+            "unchanged": [],
+            "chunks_upserted": 0,
+            "chunks_deleted": 0
+        }
         
+        # A missing directory is a misconfiguration, not a request to drop every document
+        if not os.path.isdir(provider_files_dir):
+            logger.error(f"Provider directory not found: {provider_files_dir}")
+            return report
+
+        provider_files = sorted(glob.glob(os.path.join(provider_files_dir, "*.txt")))
         if not provider_files:
-            logger.warning(f"No provider files found in {provider_files_dir}")
-            return
+            logger.warning(f"No provider files found in {provider_files_dir}, removing all indexed documents")
         
-        # Check if collection already has documents
-        existing_count = self.collection.count()
-        if existing_count > 0:
-            logger.info(f"Collection already has {existing_count} documents. Skipping indexing.")
-            return
+        # Current chunk ids and content hashes per source file
+        existing = self.collection.get(include=["metadatas"])
+        indexed_ids = {}
+        indexed_hashes = {}
+        for chunk_id, meta in zip(existing["ids"], existing["metadatas"]):
+            source_file = (meta or {}).get("source_file")
+            indexed_ids.setdefault(source_file, set()).add(chunk_id)
+            indexed_hashes.setdefault(source_file, set()).add((meta or {}).get("content_hash"))
         
         documents = []
         metadatas = []
         ids = []
+        stale_ids = []
+        seen_files = set()
         
-        for idx, file_path in enumerate(provider_files):
+        for file_path in provider_files:
+            source_file = os.path.basename(file_path)
+            seen_files.add(source_file)
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     content = f.read()
-                
-                # Extract provider name from filename
-                provider_name = os.path.basename(file_path).replace('.txt', '').replace('_', ' ').title()
-                
-                # STRATEGY 1: Always index the COMPLETE document (most important)
-                documents.append(content)
-                metadatas.append({
-                    "provider": provider_name,
-                    "source_file": os.path.basename(file_path),
-                    "chunk_type": "complete"
-                })
-                ids.append(f"{provider_name}_complete")
-                
-                # STRATEGY 2: Extract and index KEY SECTIONS separately
-                # Look for common patterns in provider files
-                lines = content.split('\n')
-                
-                # Find and index contact section
-                contact_section = []
-                address_section = []
-                policy_section = []
-                
-                for i, line in enumerate(lines):
-                    line_lower = line.lower()
-                    
-                    # Capture contact information (with context)
-                    if 'contact' in line_lower or 'phone' in line_lower or 'email' in line_lower or 'tel:' in line_lower:
-                        # Get this line and next 2 lines for complete context
-                        contact_section.extend(lines[max(0, i-1):min(len(lines), i+3)])
-                    
-                    # Capture address
-                    if 'address' in line_lower or 'official address' in line_lower:
-                        address_section.extend(lines[max(0, i-1):min(len(lines), i+3)])
-                    
-                    # Capture privacy policy section
-                    if 'privacy' in line_lower:
-                        policy_section.extend(lines[max(0, i-1):min(len(lines), i+5)])
-                
-                # Index contact section if found
-                if contact_section:
-                    contact_text = '\n'.join(set(contact_section))  # Remove duplicates
-                    documents.append(contact_text)
-                    metadatas.append({
-                        "provider": provider_name,
-                        "source_file": os.path.basename(file_path),
-                        "chunk_type": "contact"
-                    })
-                    ids.append(f"{provider_name}_contact")
-                
-                # Index address section if found
-                if address_section:
-                    address_text = '\n'.join(set(address_section))
-                    documents.append(address_text)
-                    metadatas.append({
-                        "provider": provider_name,
-                        "source_file": os.path.basename(file_path),
-                        "chunk_type": "address"
-                    })
-                    ids.append(f"{provider_name}_address")
-                
-                logger.info(f"Indexed {provider_name}: 1 complete + {len(contact_section) > 0} contact + {len(address_section) > 0} address chunks")
-            
             except Exception as e:
                 logger.error(f"Error reading {file_path}: {e}")
+                # Keep whatever is indexed for a file we can't read
+                continue
+            
+            if indexed_hashes.get(source_file) == {content_hash(content)}:
+                report["unchanged"].append(source_file)
                 continue
+            
+            file_documents, file_metadatas, file_ids = self._chunk_file(file_path, content)
+            documents.extend(file_documents)
+            metadatas.extend(file_metadatas)
+            ids.extend(file_ids)
+            # Chunks this file no longer produces
+            stale_ids.extend(indexed_ids.get(source_file, set()) - set(file_ids))
+            report["updated" if source_file in indexed_ids else "added"].append(source_file)
         
-        if documents:
-            try:
-                # Add documents to ChromaDB
-                self.collection.add(
+        for source_file, chunk_ids in indexed_ids.items():
+            if source_file not in seen_files:
+                stale_ids.extend(chunk_ids)
+                report["removed"].append(source_file)
+        
+        try:
+            if stale_ids:
+                self.collection.delete(ids=sorted(stale_ids))
+                report["chunks_deleted"] = len(stale_ids)
+            if documents:
+                self.collection.upsert(
                     documents=documents,
                     metadatas=metadatas,
                     ids=ids
                 )
-                logger.info(f"Successfully indexed {len(documents)} document chunks")
-            except Exception as e:
-                logger.error(f"Error adding documents to ChromaDB: {e}")
+                report["chunks_upserted"] = len(documents)
+        except Exception as e:
+            logger.error(f"Error updating vector store: {e}")
+            raise
+        
+        if stale_ids or documents or self.lexical_index is None:
+            self.build_local_indexes()
+        if stale_ids or documents:
+            self.index_version = self._bump_index_version()
+        
+        logger.info(
+            f"Indexing done: {len(report['added'])} added, {len(report['updated'])} updated, "
+            f"{len(report['removed'])} removed, {len(report['unchanged'])} unchanged files; "
+            f"{report['chunks_upserted']} chunks upserted, {report['chunks_deleted']} deleted"
+        )
+        return report
+    
+    def _read_index_version(self) -> int:
+        db = SessionLocal()
+        try:
+            return get_data_version(db, PROVIDER_DOCS)
+        except Exception as e:
+            logger.warning(f"Could not read the provider document version: {e}")
+            return getattr(self, "index_version", 0)
+        finally:
+            db.close()
+    
+    def _bump_index_version(self) -> int:
+        """
+        Record a document change in the database so every process sees it
+        """
+        db = SessionLocal()
+        try:
+            version = bump_data_version(db, PROVIDER_DOCS)
+            db.commit()
+            self._index_version_checked_at = time.monotonic()
+            return version
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Could not record the provider document version, other processes won't see it: {e}")
+            return self.index_version + 1
+        finally:
+            db.close()
+    
+    def index_version_due(self) -> bool:
+        """
+        Whether refresh_index_version would re-check the persisted version now
+        """
+        return time.monotonic() - self._index_version_checked_at >= ROUTE_INDEX_REFRESH_SECONDS
+    
+    def refresh_index_version(self):
+        """
+        Pick up documents reindexed by another process (python -m app.reindex or
+        another worker's /reindex). The persisted version is re-checked at most
+        every ROUTE_INDEX_REFRESH_SECONDS, as get_route_index does for the
+        reference data, so the common path does not touch the database. When it
+        changed, the local vector store is re-read from disk and the BM25 index
+        and provider matcher are rebuilt from the new chunks.
+        """
+        if not self.index_version_due():
+            return
+        with self._index_version_lock:
+            if not self.index_version_due():
+                return
+            version = self._read_index_version()
+            if version != self.index_version:
+                logger.info(f"Provider documents changed: v{self.index_version} -> v{version}")
+                try:
+                    if VECTOR_STORE_BACKEND == "local":
+                        self.collection.reload()
+                    self.build_local_indexes()
+                except Exception as e:
+                    # Keep the old version so the next check retries
+                    logger.error(f"Could not reload reindexed provider documents: {e}")
+                    self._index_version_checked_at = time.monotonic()
+                    return
+                self.index_version = version
+            self._index_version_checked_at = time.monotonic()
     
-    def retrieve_relevant_context(self, query: str, n_results: int = 5) -> tuple:
+    async def get_async_collection(self):
+        """
+        Get or create the collection through the backend's async client
+        """
+        if self.async_collection is None:
+            self.async_collection = await open_async_collection(self.embedding_function)
+        return self.async_collection
+    
+    def embed_query(self, query: str):
+        """
+        Embed a query with the collection's embedding function
+        """
+        with stage("embed"):
+            return self.embedding_function([query])[0]
+    
+    def _query_args(self, query: str, query_embedding=None) -> dict:
+        """
+        Query by precomputed embedding when available, otherwise by text
+        """
+        if query_embedding is not None:
+            return {"query_embeddings": [query_embedding]}
+        return {"query_texts": [query]}
+    
+    def build_local_indexes(self):
+        """
+        (Re)build the BM25 index and the provider-name matcher from every chunk in the collection
+        """
+        chunks = self.collection.get(include=["documents", "metadatas"])
+        self.lexical_index = BM25Index(chunks["ids"], chunks["documents"], chunks["metadatas"])
+        self.provider_matcher = ProviderMatcher(
+            [meta["provider"] for meta in chunks["metadatas"] if meta and meta.get("provider")]
+        )
+        logger.info(
+            f"Local indexes built over {len(self.lexical_index)} chunks, "
+            f"{len(self.provider_matcher.providers)} providers"
+        )
+    
+    def _mentioned_providers(self, query: str) -> list:
+        return self.provider_matcher.match(query) if self.provider_matcher else []
+    
+    def _provider_chunk_ids(self, providers: list) -> list:
+        """
+        Ids of the complete/contact/address chunks of the given providers that are indexed
+        """
+        return [
+            f"{provider}_{chunk_type}"
+            for provider in providers
+            for chunk_type in ("complete", "contact", "address")
+            if f"{provider}_{chunk_type}" in self.lexical_index.positions
+        ]
+    
+    def _lexical_hits(self, query: str, n_fetch: int) -> list:
+        """
+        Chunk ids ranked by BM25, best first
+        """
+        if RETRIEVAL_MODE == "vector" or not self.lexical_index:
+            return []
+        with stage("lexical_search"):
+            return [chunk_id for chunk_id, _ in self.lexical_index.search(query, n_fetch)]
+    
+    def _lexical_only(self, query: str, lexical_ids: list) -> bool:
+        """
+        Skip the embedding and vector query when lexical retrieval is enough:
+        always in lexical mode, and in hybrid mode when the best lexical hit
+        contains every query term
+        """
+        if not lexical_ids:
+            return False
+        return RETRIEVAL_MODE == "lexical" or self.lexical_index.covers(query, lexical_ids[0])
+
+    def needs_vector_search(self, query: str, n_results: int = 5) -> bool:
+        """
+        Whether retrieving context for a query runs the vector query (and so
+        needs its embedding): false when the provider or lexical fast path answers it
+        """
+        if self._provider_chunk_ids(self._mentioned_providers(query)):
+            return False
+        return not self._lexical_only(query, self._lexical_hits(query, min(n_results + 3, 10)))
+
+    def retrieve_relevant_context(self, query: str, n_results: int = 5, query_embedding=None) -> tuple:
         """
         Retrieve relevant document chunks for a query
-        IMPROVED: Smart retrieval that prioritizes complete documents for specific queries
+        Hybrid: BM25 and vector rankings are fused with reciprocal-rank fusion
         """
         try:
-            # First, try to get more results
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=min(n_results + 3, 10)  # Get extra results
-            )
-            
-            documents = results['documents'][0] if results['documents'] else []
-            metadatas = results['metadatas'][0] if results['metadatas'] else []
-            
-            # Smart filtering: If query mentions a specific provider, prioritize that provider's complete doc
-            query_lower = query.lower()
-            
-            # Detect if query is about a specific provider
-            providers_mentioned = []
-            for meta in metadatas:
-                provider = meta.get('provider', '')
-                if provider.lower() in query_lower:
-                    providers_mentioned.append(provider)
-            
-            # Re-order results: put complete documents of mentioned providers first
-            final_docs = []
-            final_metas = []
-            
-            # First: Add complete documents of mentioned providers
-            for doc, meta in zip(documents, metadatas):
-                if (meta.get('chunk_type') == 'complete' and 
-                    meta.get('provider') in providers_mentioned):
-                    final_docs.append(doc)
-                    final_metas.append(meta)
+            # Fast path: the question names a provider, serve that provider's chunks directly
+            providers = self._mentioned_providers(query)
+            provider_ids = self._provider_chunk_ids(providers) if providers else []
+            if provider_ids:
+                logger.info(f"Provider intent {providers}, skipping vector search")
+                return self._rank_results(query, provider_ids, {}, n_results, providers)
             
-            # Second: Add contact/address specific chunks
-            for doc, meta in zip(documents, metadatas):
-                if meta.get('chunk_type') in ['contact', 'address']:
-                    if doc not in final_docs:  # Avoid duplicates
-                        final_docs.append(doc)
-                        final_metas.append(meta)
+            n_fetch = min(n_results + 3, 10)  # Get extra results
+            lexical_ids = self._lexical_hits(query, n_fetch)
+            if self._lexical_only(query, lexical_ids):
+                logger.info("Lexical match covers the query, skipping vector search")
+                return self._rank_results(query, lexical_ids, {}, n_results)
             
-            # Third: Add other relevant chunks
-            for doc, meta in zip(documents, metadatas):
-                if doc not in final_docs and len(final_docs) < n_results:
-                    final_docs.append(doc)
-                    final_metas.append(meta)
-            
-            # Limit to n_results
-            final_docs = final_docs[:n_results]
-            final_metas = final_metas[:n_results]
+            with stage("vector_query"):
+                results = self.collection.query(
+                    **self._query_args(query, query_embedding),
+                    n_results=n_fetch
+                )
+            return self._fuse_results(query, results, lexical_ids, n_results)
+        
+        except Exception as e:
+            logger.error(f"Error retrieving context: {e}")
+            return [], []
+    
+    async def retrieve_relevant_context_async(self, query: str, n_results: int = 5, query_embedding=None) -> tuple:
+        """
+        Async version of retrieve_relevant_context
+        """
+        try:
+            providers = self._mentioned_providers(query)
+            provider_ids = self._provider_chunk_ids(providers) if providers else []
+            if provider_ids:
+                logger.info(f"Provider intent {providers}, skipping vector search")
+                return self._rank_results(query, provider_ids, {}, n_results, providers)
             
-            logger.info(f"Retrieved {len(final_docs)} chunks for query: {query}")
-            for i, (doc, meta) in enumerate(zip(final_docs, final_metas)):
-                logger.info(f"  Chunk {i+1}: {meta.get('provider')} ({meta.get('chunk_type')}) - {doc[:100]}...")
+            n_fetch = min(n_results + 3, 10)  # Get extra results
+            lexical_ids = self._lexical_hits(query, n_fetch)
+            if self._lexical_only(query, lexical_ids):
+                logger.info("Lexical match covers the query, skipping vector search")
+                return self._rank_results(query, lexical_ids, {}, n_results)
             
-            return final_docs, final_metas
+            collection = await self.get_async_collection()
+            with stage("vector_query"):
+                results = await collection.query(
+                    **self._query_args(query, query_embedding),
+                    n_results=n_fetch
+                )
+            return self._fuse_results(query, results, lexical_ids, n_results)
         
         except Exception as e:
             logger.error(f"Error retrieving context: {e}")
             return [], []
     
-    def generate_answer(self, query: str, context_docs: list, context_metadata: list) -> str:
+    def _fuse_results(self, query: str, results: dict, lexical_ids: list, n_results: int) -> tuple:
         """
-        Generate an answer using OpenRouter with retrieved context
+        Fuse vector query results with the lexical ranking
         """
-        if not self.api_key:
-            return "Error: xAI API key not configured. Please set xAI_API_KEY environment variable."
+        vector_ids = results['ids'][0] if results.get('ids') else []
+        documents = results['documents'][0] if results.get('documents') else []
+        metadatas = results['metadatas'][0] if results.get('metadatas') else []
+        chunks = {
+            chunk_id: (doc, meta)
+            for chunk_id, doc, meta in zip(vector_ids, documents, metadatas)
+        }
         
-        if not context_docs:
-            return "I couldn't find any relevant information about that in the bus provider documents."
+        ranked_ids = reciprocal_rank_fusion([vector_ids, lexical_ids]) if lexical_ids else vector_ids
+        return self._rank_results(query, ranked_ids, chunks, n_results)
+    
+    def _rank_results(self, query: str, ranked_ids: list, chunks: dict, n_results: int,
+                      providers_mentioned: list = None) -> tuple:
+        """
+        Re-order ranked chunks, putting mentioned providers and contact/address chunks first.
+        Chunks missing from `chunks` are read from the lexical index.
+        """
+        candidates = []
+        for chunk_id in ranked_ids:
+            if chunk_id in chunks:
+                doc, meta = chunks[chunk_id]
+            else:
+                doc, meta = self.lexical_index.get(chunk_id)
+            candidates.append((chunk_id, doc, meta or {}))
+        
+        # Smart filtering: If query mentions a specific provider, prioritize that provider's complete doc
+        query_lower = query.lower()
+        
+        # Detect if query is about a specific provider
+        if providers_mentioned is None:
+            providers_mentioned = set()
+            for _, _, meta in candidates:
+                provider = meta.get('provider', '')
+                if provider.lower() in query_lower:
+                    providers_mentioned.add(provider)
+        providers_mentioned = set(providers_mentioned)
+        
+        # Re-order results: put complete documents of mentioned providers first
+        final_ids = []
+        final_docs = []
+        final_metas = []
+        selected = set()
+        
+        def select(chunk_id, doc, meta):
+            selected.add(chunk_id)
+            final_ids.append(chunk_id)
+            final_docs.append(doc)
+            final_metas.append(meta)
+        
+        # First: Add complete documents of mentioned providers
+        for chunk_id, doc, meta in candidates:
+            if (meta.get('chunk_type') == 'complete' and 
+                meta.get('provider') in providers_mentioned):
+                select(chunk_id, doc, meta)
+        
+        # Second: Add contact/address specific chunks
+        for chunk_id, doc, meta in candidates:
+            if meta.get('chunk_type') in ['contact', 'address'] and chunk_id not in selected:
+                select(chunk_id, doc, meta)
+        
+        # Third: Add other relevant chunks
+        for chunk_id, doc, meta in candidates:
+            if chunk_id not in selected and len(final_docs) < n_results:
+                select(chunk_id, doc, meta)
+        
+        # Limit to n_results
+        final_docs = final_docs[:n_results]
+        final_metas = final_metas[:n_results]
+        
+        logger.info(f"Retrieved {len(final_docs)} chunks for query: {query}")
+        for i, (doc, meta) in enumerate(zip(final_docs, final_metas)):
+            logger.info(f"  Chunk {i+1}: {meta.get('provider')} ({meta.get('chunk_type')}) - {doc[:100]}...")
+        
+        return final_docs, final_metas
+    
+    def _build_prompt(self, query: str, context_docs: list, context_metadata: list) -> str:
+        """
+        Build the answer prompt from retrieved context, deduplicated and trimmed
+        to the context token budget
+        """
+        context_docs, context_metadata, context_tokens = assemble_context(context_docs, context_metadata)
         
         # Prepare context string with clear separation
         context_str = "\n\n=== DOCUMENT START ===\n\n".join([
@@ -241,13 +563,31 @@ IMPORTANT:
 
 Provide a well-formatted answer using ALL relevant information from the documents above."""
         
+        prompt_tokens = estimate_tokens(prompt)
+        RAG_PROMPT_TOKENS.observe(prompt_tokens)
+        logger.info(f"RAG prompt: ~{prompt_tokens} tokens ({context_tokens} context tokens in {len(context_docs)} chunks)")
+        return prompt
+    
+    def generate_answer(self, query: str, context_docs: list, context_metadata: list) -> str:
+        """
+        Generate an answer using OpenRouter with retrieved context
+        """
+        if not self.api_key:
+            return "Error: xAI API key not configured. Please set xAI_API_KEY environment variable."
+        
+        if not context_docs:
+            return "I couldn't find any relevant information about that in the bus provider documents."
+        
+        prompt = self._build_prompt(query, context_docs, context_metadata)
+        
         try:
-            response = self.client.chat.completions.create(
-                model="openai/gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.3  # Lower for more factual responses
-            )
+            with stage("rag_generate"), llm_call(RAG_MODEL, "rag_answer") as call:
+                response = call.response = self.client.chat.completions.create(
+                    model=RAG_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=1000,
+                    temperature=0.3  # Lower for more factual responses
+                )
             
             return response.choices[0].message.content
         
@@ -255,12 +595,110 @@ Provide a well-formatted answer using ALL relevant information from the document
             logger.error(f"Error generating answer with OpenRouter: {e}")
             return f"Error generating response: {str(e)}"
     
-    def ask(self, question: str) -> dict:
+    async def generate_answer_async(self, query: str, context_docs: list, context_metadata: list) -> str:
+        """
+        Async version of generate_answer
+        """
+        if not self.api_key:
+            return "Error: xAI API key not configured. Please set xAI_API_KEY environment variable."
+        
+        if not context_docs:
+            return "I couldn't find any relevant information about that in the bus provider documents."
+        
+        prompt = self._build_prompt(query, context_docs, context_metadata)
+        
+        try:
+            with stage("rag_generate"), llm_call(RAG_MODEL, "rag_answer") as call:
+                response = call.response = await self.async_client.chat.completions.create(
+                    model=RAG_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=1000,
+                    temperature=0.3  # Lower for more factual responses
+                )
+            
+            return response.choices[0].message.content
+        
+        except Exception as e:
+            logger.error(f"Error generating answer with OpenRouter: {e}")
+            return f"Error generating response: {str(e)}"
+    
+    async def generate_answer_stream(self, query: str, context_docs: list, context_metadata: list):
+        """
+        Streaming version of generate_answer_async, yields text chunks
+        """
+        if not self.api_key:
+            yield "Error: xAI API key not configured. Please set xAI_API_KEY environment variable."
+            return
+        
+        if not context_docs:
+            yield "I couldn't find any relevant information about that in the bus provider documents."
+            return
+        
+        prompt = self._build_prompt(query, context_docs, context_metadata)
+        
+        try:
+            with stage("rag_generate"), llm_call(RAG_MODEL, "rag_answer_stream"):
+                stream = await self.async_client.chat.completions.create(
+                    model=RAG_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=1000,
+                    temperature=0.3,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        
+        except Exception as e:
+            logger.error(f"Error streaming answer with OpenRouter: {e}")
+            yield f"Error generating response: {str(e)}"
+    
+    def template_answer(self, question: str):
+        """
+        Answer a contact/address lookup for named providers straight from the
+        labelled lines of their documents, without an LLM.
+        Returns {"answer", "sources"}, or None if the question isn't such a lookup.
+        """
+        words = set(re.findall(r"\w+", question.lower()))
+        wants_contact = bool(words & _CONTACT_WORDS) or "details" in words
+        wants_address = bool(words & _ADDRESS_WORDS) or "details" in words
+        if not (wants_contact or wants_address) or words & _NON_TEMPLATE_WORDS or not self.lexical_index:
+            return None
+        
+        providers = self._mentioned_providers(question)
+        if not providers:
+            return None
+        
+        sections = []
+        for provider in providers:
+            chunk_id = f"{provider}_complete"
+            if chunk_id not in self.lexical_index.positions:
+                return None
+            document, _ = self.lexical_index.get(chunk_id)
+            fields = dict(_LABELLED_LINE.findall(document))
+            lines = [f"**{provider}**"]
+            if wants_address and fields.get("Official Address"):
+                lines.append(f"📍 Address: {fields['Official Address']}")
+            if wants_contact and fields.get("Contact Information"):
+                lines.append(f"📞 Contact: {fields['Contact Information']}")
+            if len(lines) == 1:
+                # Document doesn't have what was asked in the expected form
+                return None
+            sections.append("\n".join(lines))
+        
+        return {
+            "answer": "\n\n".join(sections),
+            "sources": providers
+        }
+    
+    def ask(self, question: str, query_embedding=None) -> dict:
         """
         Main method to ask a question using RAG pipeline
         """
         # Retrieve relevant context (more chunks for complete info)
-        context_docs, context_metadata = self.retrieve_relevant_context(question, n_results=5)
+        context_docs, context_metadata = self.retrieve_relevant_context(
+            question, n_results=5, query_embedding=query_embedding
+        )
         
         # Generate answer
         answer = self.generate_answer(question, context_docs, context_metadata)
@@ -272,10 +710,32 @@ Provide a well-formatted answer using ALL relevant information from the document
             "answer": answer,
             "sources": sources
         }
+    
+    async def ask_async(self, question: str, context: tuple = None, query_embedding=None) -> dict:
+        """
+        Async version of ask. Accepts context that was already retrieved
+        (e.g. concurrently with route search) to avoid a second vector query.
+        """
+        if context is None:
+            context = await self.retrieve_relevant_context_async(
+                question, n_results=5, query_embedding=query_embedding
+            )
+        context_docs, context_metadata = context
+        
+        answer = await self.generate_answer_async(question, context_docs, context_metadata)
+        
+        sources = list(set([meta['provider'] for meta in context_metadata]))
+        
+        return {
+            "answer": answer,
+            "sources": sources
+        }
 
 
 # Global RAG pipeline instance
 rag_pipeline = None
+# The startup warm-up and the first request may ask for it at the same time
+_rag_pipeline_lock = threading.Lock()
 
 
 def get_rag_pipeline() -> RAGPipeline:
@@ -284,5 +744,7 @@ def get_rag_pipeline() -> RAGPipeline:
     """
     global rag_pipeline
     if rag_pipeline is None:
-        rag_pipeline = RAGPipeline()
+        with _rag_pipeline_lock:
+            if rag_pipeline is None:
+                rag_pipeline = RAGPipeline()
     return rag_pipeline
\ No newline at end of file
@@ -0,0 +1,26 @@
+import json
+import os
+import sys
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rag_pipeline import get_rag_pipeline, PROVIDERS_DIR
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def reindex(providers_dir: str = PROVIDERS_DIR) -> dict:
+    """
+    Incrementally reindex provider documents and return what changed
+    """
+    rag = get_rag_pipeline()
+    report = rag.index_documents(providers_dir)
+    report["document_count"] = rag.collection.count()
+    return report
+
+
+if __name__ == "__main__":
+    print(json.dumps(reindex(*sys.argv[1:2]), indent=2))
@@ -0,0 +1,152 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import update, select
+from sqlalchemy.orm import Session
+from .models import Trip, SeatHold, Booking
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How long held seats stay reserved without being confirmed
+SEAT_HOLD_TTL_SECONDS = int(os.getenv("SEAT_HOLD_TTL_SECONDS", "600"))
+# Most expired holds returned to their trips per sweep
+EXPIRY_SWEEP_LIMIT = 500
+
+# Seat counts only ever change through these single-statement conditional
+# updates: no row is read and then written, and no table is locked. On a hot
+# trip each statement holds the trip's row lock only until its transaction
+# commits, and a request that would oversell updates zero rows instead of waiting.
+
+
+def take_seats(db: Session, trip_id: int, seats: int) -> bool:
+    """
+    Decrement a trip's available seats if at least `seats` are left
+    """
+    result = db.execute(
+        update(Trip)
+        .where(Trip.id == trip_id, Trip.available_seats >= seats)
+        .values(available_seats=Trip.available_seats - seats)
+    )
+    return result.rowcount == 1
+
+
+def return_seats(db: Session, trip_id: int, seats: int):
+    db.execute(
+        update(Trip)
+        .where(Trip.id == trip_id)
+        .values(available_seats=Trip.available_seats + seats)
+    )
+
+
+def _transition(db: Session, hold_id: int, to_status: str, unexpired: bool = False, **values) -> bool:
+    """
+    Move a hold from "held" to another status; False if it isn't held (anymore)
+    """
+    conditions = [SeatHold.id == hold_id, SeatHold.status == "held"]
+    if unexpired:
+        conditions.append(SeatHold.expires_at > datetime.utcnow())
+    result = db.execute(update(SeatHold).where(*conditions).values(status=to_status, **values))
+    return result.rowcount == 1
+
+
+def release_expired_holds(db: Session, trip_id: int = None, trip_ids: list = None) -> int:
+    """
+    Give the seats of expired, unconfirmed holds back to their trips (one trip,
+    the given trips or all). Each hold is claimed with a conditional update first, so
+    concurrent sweeps never return the same seats twice.
+    The caller is responsible for committing the session.
+    """
+    query = select(SeatHold.id, SeatHold.trip_id, SeatHold.seats).where(
+        SeatHold.status == "held", SeatHold.expires_at <= datetime.utcnow()
+    )
+    if trip_id is not None:
+        query = query.where(SeatHold.trip_id == trip_id)
+    if trip_ids is not None:
+        query = query.where(SeatHold.trip_id.in_(trip_ids))
+
+    released = 0
+    for hold_id, hold_trip_id, seats in db.execute(query.limit(EXPIRY_SWEEP_LIMIT)).all():
+        if _transition(db, hold_id, "expired"):
+            return_seats(db, hold_trip_id, seats)
+            released += seats
+    if released:
+        logger.info(f"Released {released} seats from expired holds")
+    return released
+
+
+def hold_seats(db: Session, trip_id: int, seats: int, user_name: str, phone: str):
+    """
+    Hold seats on a trip for SEAT_HOLD_TTL_SECONDS; None if not enough are
+    left (or there is no such trip). Commits the session.
+    """
+    if not take_seats(db, trip_id, seats):
+        # Seats of expired holds may be waiting to be returned
+        if not (release_expired_holds(db, trip_id) and take_seats(db, trip_id, seats)):
+            db.commit()
+            return None
+
+    hold = SeatHold(
+        trip_id=trip_id,
+        seats=seats,
+        user_name=user_name,
+        phone=phone,
+        status="held",
+        expires_at=datetime.utcnow() + timedelta(seconds=SEAT_HOLD_TTL_SECONDS)
+    )
+    db.add(hold)
+    db.commit()
+    return hold
+
+
+def confirm_hold(db: Session, hold: SeatHold, trip: Trip):
+    """
+    Turn an unexpired hold into a booking, atomically: the hold is claimed
+    and the booking inserted in one transaction. None if the hold expired
+    or was already confirmed or released. Commits the session.
+    One booking covers all of the hold's seats; the count stays on the hold
+    (SeatHold.booking_id links them), so bookings need no seats column.
+    """
+    booking = Booking(
+        user_name=hold.user_name,
+        phone=hold.phone,
+        from_district=trip.from_district,
+        to_district=trip.to_district,
+        bus_provider_id=trip.bus_provider_id,
+        travel_date=trip.travel_date,
+        status="active"
+    )
+    db.add(booking)
+    db.flush()
+    if not _transition(db, hold.id, "confirmed", unexpired=True, booking_id=booking.id):
+        db.rollback()
+        return None
+    db.commit()
+    return booking
+
+
+def release_hold(db: Session, hold: SeatHold) -> bool:
+    """
+    Give a held, unconfirmed hold's seats back. Commits the session.
+    """
+    if not _transition(db, hold.id, "released"):
+        db.rollback()
+        return False
+    return_seats(db, hold.trip_id, hold.seats)
+    db.commit()
+    return True
+
+
+def cancel_booked_seats(db: Session, booking_id: int):
+    """
+    Return the seats of a cancelled booking made through a hold.
+    The caller is responsible for committing the session.
+    """
+    hold = db.query(SeatHold).filter(SeatHold.booking_id == booking_id).first()
+    if hold is None:
+        return
+    result = db.execute(
+        update(SeatHold).where(SeatHold.id == hold.id, SeatHold.status == "confirmed").values(status="cancelled")
+    )
+    if result.rowcount == 1:
+        return_seats(db, hold.trip_id, hold.seats)
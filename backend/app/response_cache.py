@@ -0,0 +1,115 @@
+import os
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from .metrics import RESPONSE_CACHE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+
+# Clients may keep a response but must revalidate it (cheaply, via ETag) before use
+CACHE_CONTROL = "no-cache"
+
+
+class ResponseCache:
+    """
+    LRU cache of serialized JSON responses and their strong ETags for endpoints
+    derived only from the reference data. Entries belong to one reference data
+    version; a newer version drops them all.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.max_size = max_size
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: int, key):
+        with self._lock:
+            if version != self.version:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, version: int, key, body: bytes) -> tuple:
+        # Strong ETag: identical bytes, identical tag, in every worker
+        entry = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        with self._lock:
+            if self.version is None or version > self.version:
+                self._entries.clear()
+                self.version = version
+            elif version < self.version:
+                # Built from an older snapshot than the cache holds: serve, don't keep
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "version": self.version}
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def cached_json_response(request: Request, endpoint: str, key, version: int, build,
+                         headers: dict = None) -> Response:
+    """
+    JSON response for `key` at a reference data version. build() returns the
+    serialized body and only runs on a cache miss; a matching If-None-Match
+    gets 304 Not Modified without a body. `headers` are added to either.
+    """
+    cache_key = (endpoint, key)
+    entry = response_cache.get(version, cache_key)
+    result = "hit"
+    if entry is None:
+        result = "miss"
+        entry = response_cache.put(version, cache_key, build())
+
+    body, etag = entry
+    headers = dict(headers or {}, **{"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    if _matches(request.headers.get("if-none-match"), etag):
+        RESPONSE_CACHE.inc(endpoint=endpoint, result="not_modified")
+        return Response(status_code=304, headers=headers)
+    RESPONSE_CACHE.inc(endpoint=endpoint, result=result)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def streamed_response(request: Request, endpoint: str, key, version: int, chunks, media_type: str,
+                      headers: dict = None) -> Response:
+    """
+    Streamed response for bodies too large to keep in the cache. chunks() yields
+    the body lazily. The body is a pure function of the key at a reference data
+    version, so the strong ETag is derived from those rather than from the bytes;
+    a matching If-None-Match gets 304 without generating anything.
+    """
+    tag = hashlib.sha256(f"{endpoint}|{version}|{key!r}".encode()).hexdigest()[:32]
+    headers = dict(headers or {}, **{"ETag": f'"{tag}"', "Cache-Control": CACHE_CONTROL})
+    if _matches(request.headers.get("if-none-match"), headers["ETag"]):
+        RESPONSE_CACHE.inc(endpoint=endpoint, result="not_modified")
+        return Response(status_code=304, headers=headers)
+    RESPONSE_CACHE.inc(endpoint=endpoint, result="streamed")
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+
+# Global response cache shared by the reference data endpoints
+response_cache = ResponseCache()
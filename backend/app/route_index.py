@@ -0,0 +1,222 @@
+import os
+import time
+import threading
+import logging
+from bisect import bisect_right
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import BusProvider, District, DroppingPoint, provider_coverage
+from .data_version import get_data_version
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How often (seconds) to check the reference data version for changes
+ROUTE_INDEX_REFRESH_SECONDS = float(os.getenv("ROUTE_INDEX_REFRESH_SECONDS", "30"))
+
+
+class RouteIndex:
+    """
+    Process-local, read-only snapshot of the route reference data:
+    - district name -> id
+    - per-district provider coverage as an integer bitset (bit i = provider i)
+    - per-district dropping points sorted by price
+    """
+
+    def __init__(self, version: int, district_ids: dict, provider_names: list,
+                 coverage: dict, dropping_points: dict):
+        self.version = version
+        self.district_ids = district_ids
+        self.provider_names = provider_names
+        self.coverage = coverage
+        # district_id -> (prices, names), both sorted by price
+        self.dropping_points = dropping_points
+
+    @classmethod
+    def build(cls, db: Session, version: int) -> "RouteIndex":
+        """
+        Load all reference data in three queries and build the index
+        """
+        district_ids = {name: district_id for district_id, name in db.query(District.id, District.name)}
+
+        providers = db.query(BusProvider.id, BusProvider.name).order_by(BusProvider.id).all()
+        provider_names = [name for _, name in providers]
+        provider_bits = {provider_id: bit for bit, (provider_id, _) in enumerate(providers)}
+
+        coverage = {district_id: 0 for district_id in district_ids.values()}
+        for provider_id, district_id in db.query(provider_coverage.c.provider_id, provider_coverage.c.district_id):
+            coverage[district_id] = coverage.get(district_id, 0) | (1 << provider_bits[provider_id])
+
+        points = {}
+        rows = db.query(DroppingPoint.district_id, DroppingPoint.name, DroppingPoint.price).order_by(
+            DroppingPoint.district_id, DroppingPoint.price, DroppingPoint.id
+        )
+        for district_id, name, price in rows:
+            prices, names = points.setdefault(district_id, ([], []))
+            prices.append(price)
+            names.append(name)
+
+        logger.info(
+            f"Built route index v{version}: {len(district_ids)} districts, "
+            f"{len(provider_names)} providers, {sum(len(p) for p, _ in points.values())} dropping points"
+        )
+        return cls(version, district_ids, provider_names, coverage, points)
+
+    def get_district_id(self, name: str):
+        """Return the id of a district by exact name, or None"""
+        return self.district_ids.get(name)
+
+    def providers_between(self, from_id: int, to_id: int) -> list:
+        """
+        Names of providers covering both districts, in provider id order
+        """
+        bits = self.coverage.get(from_id, 0) & self.coverage.get(to_id, 0)
+        names = []
+        while bits:
+            low = bits & -bits
+            names.append(self.provider_names[low.bit_length() - 1])
+            bits ^= low
+        return names
+
+    def dropping_points_for(self, district_id: int, max_price: int = None) -> list:
+        """
+        (name, price) pairs for a district, cheapest first, optionally capped by price
+        """
+        prices, names = self.dropping_points.get(district_id, ((), ()))
+        end = bisect_right(prices, max_price) if max_price else len(prices)
+        return list(zip(names[:end], prices[:end]))
+
+    def coverage_matrix(self) -> tuple:
+        """
+        (district ids in id order, district x provider boolean matrix)
+        """
+        district_ids = sorted(self.district_ids.values())
+        matrix = np.zeros((len(district_ids), len(self.provider_names)), dtype=bool)
+        for row, district_id in enumerate(district_ids):
+            bits = self.coverage.get(district_id, 0)
+            while bits:
+                low = bits & -bits
+                matrix[row, low.bit_length() - 1] = True
+                bits ^= low
+        return district_ids, matrix
+
+    def cheapest_prices(self, district_ids: list) -> np.ndarray:
+        """
+        Cheapest dropping point price per district, NaN where there is none
+        """
+        return np.array(
+            [self.dropping_points.get(district_id, ((np.nan,), ()))[0][0] for district_id in district_ids],
+            dtype=np.float64
+        )
+
+    def count(self, from_id: int, to_id: int, max_price: int = None) -> int:
+        """
+        Number of search results for a route, without building them
+        """
+        if from_id == to_id:
+            return 0
+        providers = self.providers_between(from_id, to_id)
+        if not providers:
+            return 0
+        prices, _ = self.dropping_points.get(to_id, ((), ()))
+        return len(providers) * (bisect_right(prices, max_price) if max_price else len(prices))
+
+    def iter_search(self, from_id: int, to_id: int, max_price: int = None, sort_by: str = None,
+                    start: int = 0, stop: int = None):
+        """
+        Lazily yield (provider, drop_point, price) for a route, rows start..stop
+        of the result in the given order:
+        - None: by provider (in id order), then price
+        - "price": by price, then provider id
+        - "provider": by provider name, then price
+        Every provider serves the same dropping points, so each order is a
+        nested loop over two sorted lists and `start` is reached by arithmetic
+        instead of skipping rows. A district has no route to itself.
+        """
+        if from_id == to_id:
+            return
+        providers = self.providers_between(from_id, to_id)
+        if not providers:
+            return
+        points = self.dropping_points_for(to_id, max_price)
+        if sort_by == "provider":
+            providers = sorted(providers)
+
+        by_price = sort_by == "price"
+        outer, inner = (points, providers) if by_price else (providers, points)
+
+        total = len(outer) * len(inner)
+        stop = total if stop is None else min(stop, total)
+        if start >= stop:
+            return
+        i, j = divmod(start, len(inner))
+        for _ in range(stop - start):
+            if by_price:
+                (name, price), provider = outer[i], inner[j]
+            else:
+                provider, (name, price) = outer[i], inner[j]
+            yield provider, name, price
+            j += 1
+            if j == len(inner):
+                i, j = i + 1, 0
+
+    def search(self, from_id: int, to_id: int, max_price: int = None) -> list:
+        """
+        (provider, drop_point, price) tuples for a route
+        """
+        return list(self.iter_search(from_id, to_id, max_price))
+
+
+# Global route index instance
+route_index = None
+_route_index_checked_at = 0.0
+_route_index_lock = threading.Lock()
+
+
+def get_route_index(db: Session) -> RouteIndex:
+    """
+    Get the route index, rebuilding it when the reference data version changes.
+    The version is re-checked at most every ROUTE_INDEX_REFRESH_SECONDS, so the
+    common path does not touch the database.
+    """
+    global route_index, _route_index_checked_at
+    if route_index is not None and time.monotonic() - _route_index_checked_at < ROUTE_INDEX_REFRESH_SECONDS:
+        return route_index
+
+    with _route_index_lock:
+        if route_index is not None and time.monotonic() - _route_index_checked_at < ROUTE_INDEX_REFRESH_SECONDS:
+            return route_index
+
+        version = get_data_version(db)
+        if route_index is None or route_index.version != version:
+            route_index = RouteIndex.build(db, version)
+        _route_index_checked_at = time.monotonic()
+
+    return route_index
+
+
+async def get_route_index_async(db: AsyncSession) -> RouteIndex:
+    """
+    Async version of get_route_index. Runs the version check and rebuild through
+    the async session without taking the thread lock, so the event loop never blocks;
+    a concurrent duplicate rebuild is harmless.
+    """
+    global route_index, _route_index_checked_at
+    if route_index is not None and time.monotonic() - _route_index_checked_at < ROUTE_INDEX_REFRESH_SECONDS:
+        return route_index
+
+    version = await db.run_sync(get_data_version)
+    if route_index is None or route_index.version != version:
+        route_index = await db.run_sync(RouteIndex.build, version)
+    _route_index_checked_at = time.monotonic()
+
+    return route_index
+
+
+def invalidate_route_index():
+    """
+    Force the next get_route_index call to re-check the data version
+    """
+    global _route_index_checked_at
+    _route_index_checked_at = 0.0
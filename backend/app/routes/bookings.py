@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import insert, tuple_
+from typing import List, Optional
 from datetime import datetime
 from ..database import get_db
 from ..models import Booking, BusProvider
-from ..schemas import BookingCreate, BookingResponse
+from ..reservations import cancel_booked_seats
+from ..schemas import (
+    BookingCreate, BookingResponse,
+    BookingBatchRequest, BookingBatchResponse, BookingBatchItemResult
+)
 
 router = APIRouter(prefix="/api/bookings", tags=["bookings"])
 
@@ -68,36 +74,173 @@ def create_booking(
     return response
 
 
+@router.post("/batch", response_model=BookingBatchResponse)
+def create_bookings_batch(
+    batch: BookingBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Create many bookings in one transaction (e.g. agency group bookings).
+    All rows are validated up front, providers are resolved in one query and
+    the valid rows are inserted with a single multi-row INSERT ... RETURNING.
+    In all_or_nothing mode any invalid row rejects the whole batch.
+    """
+    rows = batch.bookings
+    
+    # Resolve all providers in one query
+    provider_names = {row.bus_provider for row in rows}
+    provider_ids = dict(
+        db.query(BusProvider.name, BusProvider.id).filter(BusProvider.name.in_(provider_names)).all()
+    )
+    
+    # Validate every row before inserting anything
+    errors = {}
+    for index, row in enumerate(rows):
+        if row.bus_provider not in provider_ids:
+            errors[index] = f"Bus provider '{row.bus_provider}' not found"
+            continue
+        try:
+            datetime.strptime(row.travel_date, "%Y-%m-%d")
+        except ValueError:
+            errors[index] = "Invalid date format. Use YYYY-MM-DD"
+    
+    if errors and batch.mode == "all_or_nothing":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": f"No bookings created: {len(errors)} of {len(rows)} rows are invalid",
+                "results": [
+                    BookingBatchItemResult(index=index, success=False, error=error).model_dump()
+                    for index, error in sorted(errors.items())
+                ]
+            }
+        )
+    
+    valid = [index for index in range(len(rows)) if index not in errors]
+    booking_date = datetime.utcnow()
+    created = {}
+    
+    if valid:
+        inserted = db.execute(
+            insert(Booking).returning(Booking.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_name": rows[index].user_name,
+                    "phone": rows[index].phone,
+                    "from_district": rows[index].from_district,
+                    "to_district": rows[index].to_district,
+                    "bus_provider_id": provider_ids[rows[index].bus_provider],
+                    "travel_date": rows[index].travel_date,
+                    "booking_date": booking_date,
+                    "status": "active"
+                }
+                for index in valid
+            ]
+        ).scalars().all()
+        db.commit()
+        created = dict(zip(valid, inserted))
+    
+    results = []
+    for index, row in enumerate(rows):
+        if index in created:
+            results.append(BookingBatchItemResult(
+                index=index,
+                success=True,
+                booking=BookingResponse(
+                    id=created[index],
+                    user_name=row.user_name,
+                    phone=row.phone,
+                    from_district=row.from_district,
+                    to_district=row.to_district,
+                    bus_provider=row.bus_provider,
+                    travel_date=row.travel_date,
+                    booking_date=booking_date,
+                    status="active"
+                )
+            ))
+        else:
+            results.append(BookingBatchItemResult(index=index, success=False, error=errors[index]))
+    
+    return BookingBatchResponse(
+        created=len(created),
+        failed=len(errors),
+        results=results
+    )
+
+
+def _encode_cursor(booking_date: datetime, booking_id: int) -> str:
+    raw = f"{booking_date.isoformat()}|{booking_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        booking_date, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(booking_date), int(booking_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/{phone}", response_model=List[BookingResponse])
 def get_bookings_by_phone(
     phone: str,
+    response: Response,
+    status: Optional[str] = Query(None, pattern=r'^(active|cancelled)$', description="Only bookings with this status"),
+    travel_date_from: Optional[str] = Query(None, description="Earliest travel date (YYYY-MM-DD)"),
+    travel_date_to: Optional[str] = Query(None, description="Latest travel date (YYYY-MM-DD)"),
+    limit: int = Query(100, ge=1, le=500, description="Bookings per page"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all bookings for a phone number
+    Get bookings for a phone number, newest first.
+    Provider names come from the same joined query. Pages are keyed on
+    (booking_date, id); when more bookings remain, the cursor for the next
+    page is returned in the X-Next-Cursor header.
     """
-    bookings = db.query(Booking).filter(Booking.phone == phone).all()
-    
-    # Build response with provider names
-    responses = []
-    for booking in bookings:
-        provider = db.query(BusProvider).filter(
-            BusProvider.id == booking.bus_provider_id
-        ).first()
-        
-        responses.append(BookingResponse(
+    for value in (travel_date_from, travel_date_to):
+        if value is not None:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    query = db.query(Booking, BusProvider.name).outerjoin(
+        BusProvider, BusProvider.id == Booking.bus_provider_id
+    ).filter(Booking.phone == phone)
+    
+    if status:
+        query = query.filter(Booking.status == status)
+    # travel_date is stored as YYYY-MM-DD, so string comparison orders by date
+    if travel_date_from:
+        query = query.filter(Booking.travel_date >= travel_date_from)
+    if travel_date_to:
+        query = query.filter(Booking.travel_date <= travel_date_to)
+    if cursor:
+        query = query.filter(tuple_(Booking.booking_date, Booking.id) < _decode_cursor(cursor))
+    
+    # One extra row tells whether another page exists
+    rows = query.order_by(Booking.booking_date.desc(), Booking.id.desc()).limit(limit + 1).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last.booking_date, last.id)
+    
+    return [
+        BookingResponse(
             id=booking.id,
             user_name=booking.user_name,
             phone=booking.phone,
             from_district=booking.from_district,
             to_district=booking.to_district,
-            bus_provider=provider.name if provider else "Unknown",
+            bus_provider=provider_name or "Unknown",
             travel_date=booking.travel_date,
             booking_date=booking.booking_date,
             status=booking.status
-        ))
-    
-    return responses
+        )
+        for booking, provider_name in rows
+    ]
 
 
 @router.delete("/{booking_id}")
@@ -117,6 +260,8 @@ def cancel_booking(
         raise HTTPException(status_code=400, detail="Booking already cancelled")
     
     booking.status = "cancelled"
+    # Bookings made through a seat hold give their seats back to the trip
+    cancel_booked_seats(db, booking_id)
     db.commit()
     
     return {"message": "Booking cancelled successfully", "booking_id": booking_id}
\ No newline at end of file
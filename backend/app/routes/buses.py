@@ -1,78 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import json
+import base64
+from itertools import islice
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from sqlalchemy import func  # Add this import
-from typing import List
+from typing import List, Optional
 from ..database import get_db
-from ..models import BusProvider, District, DroppingPoint, provider_coverage
-from ..schemas import BusSearchRequest, BusSearchResult, BusProviderResponse
+from ..models import BusProvider
+from ..route_index import get_route_index
+from ..journey_planner import get_journey_planner
+from ..fare_matrix import get_fare_matrix
+from ..response_cache import cached_json_response, streamed_response
+from ..schemas import (
+    BusSearchRequest, BusSearchResult, BusProviderResponse, JourneySearchRequest, Journey, FareMatrixResponse
+)
 
 router = APIRouter(prefix="/api/buses", tags=["buses"])
 
+# Search responses with more rows are streamed instead of cached
+SEARCH_CACHE_MAX_ROWS = int(os.getenv("SEARCH_CACHE_MAX_ROWS", "1000"))
+# Rows per streamed chunk
+SEARCH_STREAM_CHUNK_ROWS = 500
+NDJSON = "application/x-ndjson"
+
+_providers = TypeAdapter(List[BusProviderResponse])
+_journeys = TypeAdapter(List[Journey])
+_fare_matrix = TypeAdapter(FareMatrixResponse)
+
+
+def _encode_search_cursor(version: int, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{version}|{offset}".encode()).decode()
+
+
+def _decode_search_cursor(cursor: str) -> tuple:
+    try:
+        version, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        version, offset = int(version), int(offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return version, offset
+
+
+def _search_rows(index, from_id: int, to_id: int, search_request: BusSearchRequest, start: int, stop: int):
+    """
+    Lazily serialize search results as BusSearchResult JSON objects, one
+    string per row. Names are escaped once per request, not once per row.
+    """
+    quoted = {}
+
+    def quote(value: str) -> str:
+        if value not in quoted:
+            quoted[value] = json.dumps(value, ensure_ascii=False)
+        return quoted[value]
+
+    tail = f',"from_district":{quote(search_request.from_district)},"to_district":{quote(search_request.to_district)}}}'
+    rows = index.iter_search(from_id, to_id, search_request.max_price, search_request.sort_by, start, stop)
+    for provider_name, drop_point, price in rows:
+        yield f'{{"provider_name":{quote(provider_name)},"drop_point":{quote(drop_point)},"price":{price}{tail}'
+
+
+def _json_array(rows):
+    yield "["
+    separator = ""
+    for batch in iter(lambda: list(islice(rows, SEARCH_STREAM_CHUNK_ROWS)), []):
+        yield separator + ",".join(batch)
+        separator = ","
+    yield "]"
+
+
+def _ndjson(rows):
+    for batch in iter(lambda: list(islice(rows, SEARCH_STREAM_CHUNK_ROWS)), []):
+        yield "\n".join(batch) + "\n"
+
 
 @router.post("/search", response_model=List[BusSearchResult])
 def search_buses(
     search_request: BusSearchRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
-    Search for buses between two districts
+    Search for buses between two districts.
+    Results can be sorted (sort_by) and paged (limit; the cursor for the next
+    page is returned in the X-Next-Cursor header). Rows are generated lazily
+    from the route index: responses of up to SEARCH_CACHE_MAX_ROWS rows are
+    cached per reference data version, larger ones, and NDJSON
+    (Accept: application/x-ndjson), are streamed. Every response carries an
+    ETag; send it back in If-None-Match to get 304 Not Modified.
     """
     from_district = search_request.from_district
     to_district = search_request.to_district
     max_price = search_request.max_price
     
+    # Answer from the in-memory route index
+    index = get_route_index(db)
+    
     # Validate districts exist
-    from_dist = db.query(District).filter(District.name == from_district).first()
-    to_dist = db.query(District).filter(District.name == to_district).first()
+    from_id = index.get_district_id(from_district)
+    to_id = index.get_district_id(to_district)
     
-    if not from_dist:
+    if from_id is None:
         raise HTTPException(status_code=404, detail=f"District '{from_district}' not found")
-    if not to_dist:
+    if to_id is None:
         raise HTTPException(status_code=404, detail=f"District '{to_district}' not found")
     
-    # Find providers that cover both districts
-    query = db.query(BusProvider).join(
-        provider_coverage, BusProvider.id == provider_coverage.c.provider_id
-    ).filter(
-        provider_coverage.c.district_id.in_([from_dist.id, to_dist.id])
-    ).group_by(BusProvider.id).having(
-        func.count(provider_coverage.c.district_id) == 2  # Changed from db.func.count
-    )
+    # Cursors are offsets into the results of one reference data version
+    start = 0
+    if search_request.cursor:
+        version, start = _decode_search_cursor(search_request.cursor)
+        if version != index.version:
+            raise HTTPException(status_code=409, detail="Search results have changed; start again from the first page")
     
-    providers = query.all()
+    total = index.count(from_id, to_id, max_price)
+    stop = total if search_request.limit is None else min(start + search_request.limit, total)
+    headers = {"Vary": "Accept"}
+    if stop < total:
+        headers["X-Next-Cursor"] = _encode_search_cursor(index.version, stop)
     
-    if not providers:
-        return []
+    key = (from_district, to_district, max_price, search_request.sort_by, start, stop)
+    rows = lambda: _search_rows(index, from_id, to_id, search_request, start, stop)
     
-    # Get dropping points for destination district
-    dropping_points = db.query(DroppingPoint).filter(
-        DroppingPoint.district_id == to_dist.id
+    if NDJSON in request.headers.get("accept", ""):
+        return streamed_response(
+            request, "search", ("ndjson",) + key, index.version, lambda: _ndjson(rows()), NDJSON, headers
+        )
+    if stop - start > SEARCH_CACHE_MAX_ROWS:
+        return streamed_response(
+            request, "search", key, index.version, lambda: _json_array(rows()), "application/json", headers
+        )
+    return cached_json_response(
+        request, "search", key, index.version, lambda: "".join(_json_array(rows())).encode(), headers
     )
+
+
+@router.post("/journeys", response_model=List[Journey])
+def search_journeys(
+    journey_request: JourneySearchRequest,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Cheapest journeys between two districts, changing buses up to
+    max_transfers times when no single provider covers both.
+    Cached per district pair and reference data version, with an ETag.
+    """
+    index = get_route_index(db)
     
-    if max_price:
-        dropping_points = dropping_points.filter(DroppingPoint.price <= max_price)
+    from_id = index.get_district_id(journey_request.from_district)
+    to_id = index.get_district_id(journey_request.to_district)
     
-    dropping_points = dropping_points.all()
+    if from_id is None:
+        raise HTTPException(status_code=404, detail=f"District '{journey_request.from_district}' not found")
+    if to_id is None:
+        raise HTTPException(status_code=404, detail=f"District '{journey_request.to_district}' not found")
     
-    # Build results
-    results = []
-    for provider in providers:
-        for dp in dropping_points:
-            results.append(BusSearchResult(
-                provider_name=provider.name,
-                drop_point=dp.name,
-                price=dp.price,
-                from_district=from_district,
-                to_district=to_district
-            ))
+    def build():
+        planner = get_journey_planner(index)
+        return _journeys.dump_json(_journeys.validate_python(
+            planner.journeys(from_id, to_id, journey_request.max_transfers, journey_request.limit)
+        ))
     
-    return results
+    key = (from_id, to_id, journey_request.max_transfers, journey_request.limit)
+    return cached_json_response(request, "journeys", key, index.version, build)
+
+
+@router.get("/fares", response_model=FareMatrixResponse)
+def get_fares(
+    request: Request,
+    from_district: Optional[str] = Query(None, description="Only fares from this district"),
+    bus_provider: Optional[str] = Query(None, description="Only fares of this provider"),
+    db: Session = Depends(get_db)
+):
+    """
+    Minimum fare between every pair of districts, optionally for one origin
+    and/or one provider, with min/median/max over the returned fares.
+    Computed for all pairs and providers at once and cached per reference
+    data version, with an ETag.
+    """
+    index = get_route_index(db)
+    
+    from_id = None
+    if from_district is not None:
+        from_id = index.get_district_id(from_district)
+        if from_id is None:
+            raise HTTPException(status_code=404, detail=f"District '{from_district}' not found")
+    if bus_provider is not None and bus_provider not in index.provider_names:
+        raise HTTPException(status_code=404, detail=f"Bus provider '{bus_provider}' not found")
+    
+    def build():
+        matrix = get_fare_matrix(index)
+        return _fare_matrix.dump_json(_fare_matrix.validate_python(matrix.slice(from_id, bus_provider)))
+    
+    return cached_json_response(request, "fares", (from_id, bus_provider), index.version, build)
 
 
 @router.get("/providers", response_model=List[BusProviderResponse])
-def get_all_providers(db: Session = Depends(get_db)):
+def get_all_providers(request: Request, db: Session = Depends(get_db)):
     """
-    Get all bus providers
+    Get all bus providers (cached per reference data version, with an ETag)
     """
-    providers = db.query(BusProvider).all()
-    return providers
\ No newline at end of file
+    def build():
+        return _providers.dump_json(_providers.validate_python(db.query(BusProvider).all(), from_attributes=True))
+    
+    return cached_json_response(request, "providers", None, get_route_index(db).version, build)
@@ -1,25 +1,49 @@
 import os
+import json
+import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..query_router import get_query_router, QueryRouter
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
+from ..answer_cache import get_answer_cache
 from ..schemas import ProviderQuestionRequest, ProviderQuestionResponse
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/providers", tags=["providers"])
 
 
+def get_query_router():
+    """
+    Query router dependency. The RAG stack (openai, vector store, embedding
+    model) is imported on the first chat request or by the startup warm-up,
+    not when the app is imported.
+    """
+    from ..query_router import get_query_router
+    return get_query_router()
+
+
+def _sse(event: str, payload: dict) -> str:
+    """
+    Format one server-sent event
+    """
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
 @router.post("/ask", response_model=ProviderQuestionResponse)
-def ask_provider_question(
+async def ask_provider_question(
     request: ProviderQuestionRequest,
-    db: Session = Depends(get_db),
-    query_router: QueryRouter = Depends(get_query_router)
+    query_router=Depends(get_query_router)
 ):
     """
     Ask any question - about routes, prices, or provider information
     The system will automatically detect the query type and respond appropriately
+    Runs fully async so chat requests don't hold threadpool workers during LLM calls.
+    Identical concurrent questions share one computation, which opens its own
+    database session rather than borrowing this request's.
     """
     try:
-        result = query_router.answer_question(request.question, db)
+        result = await query_router.answer_question_async(request.question)
         
         return ProviderQuestionResponse(
             answer=result["answer"],
@@ -31,57 +55,70 @@ def ask_provider_question(
             status_code=500,
             detail=f"Error processing question: {str(e)}"
         )
+
+
+@router.post("/ask/stream")
+async def ask_provider_question_stream(
+    request: ProviderQuestionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    query_router=Depends(get_query_router)
+):
+    """
+    Streaming version of /ask using server-sent events:
+    - `meta`: query type, sources and route results, sent before the answer text
+    - `token`: answer text chunks as the LLM produces them
+    - `done`: end of the answer (or `error` if the pipeline failed)
+    """
+    async def event_stream():
+        try:
+            async for event, payload in query_router.answer_question_stream(request.question, db):
+                yield _sse(event, payload)
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}", exc_info=True)
+            yield _sse("error", {"detail": f"Error processing question: {str(e)}"})
     
-# @router.post("/reindex")
-# def reindex_documents(rag: RAGPipeline = Depends(get_rag_pipeline)):
-#     """
-#     Manually reindex provider documents
-#     """
-#     try:
-#         providers_dir = "/app/data/providers"
-        
-#         # Check if directory exists
-#         if not os.path.exists(providers_dir):
-#             raise HTTPException(
-#                 status_code=404,
-#                 detail=f"Providers directory not found: {providers_dir}"
-#             )
-        
-#         # List files in directory
-#         files = os.listdir(providers_dir)
-#         txt_files = [f for f in files if f.endswith('.txt')]
-        
-#         if not txt_files:
-#             raise HTTPException(
-#                 status_code=404,
-#                 detail=f"No .txt files found in {providers_dir}. Found: {files}"
-#             )
-        
-#         # Clear existing documents
-#         try:
-#             rag.chroma_client.delete_collection("bus_providers")
-#             rag.collection = rag.chroma_client.get_or_create_collection(
-#                 name="bus_providers",
-#                 metadata={"description": "Bus provider information and policies"}
-#             )
-#         except:
-#             pass
-        
-#         # Reindex
-#         rag.index_documents(providers_dir)
-        
-#         count = rag.collection.count()
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/cache/stats")
+def get_answer_cache_stats(query_router=Depends(get_query_router)):
+    """
+    Hit/miss counters and size of the chat answer cache, plus how many
+    requests were coalesced with an identical in-flight one
+    """
+    return {**get_answer_cache().stats(), "coalesced": query_router.single_flight.coalesced}
+
+
+@router.post("/reindex")
+def reindex_documents():
+    """
+    Incrementally reindex provider documents.
+    Only new or changed files are re-embedded; chunks of removed files are deleted.
+    """
+    from ..rag_pipeline import get_rag_pipeline, PROVIDERS_DIR
+    
+    if not os.path.exists(PROVIDERS_DIR):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Providers directory not found: {PROVIDERS_DIR}"
+        )
+    
+    try:
+        rag = get_rag_pipeline()
+        report = rag.index_documents(PROVIDERS_DIR)
         
-#         return {
-#             "message": "Reindexing completed",
-#             "document_count": count,
-#             "txt_files_found": txt_files
-#         }
+        return {
+            "message": "Reindexing completed",
+            "document_count": rag.collection.count(),
+            **report
+        }
     
-#     except HTTPException:
-#         raise
-#     except Exception as e:
-#         raise HTTPException(
-#             status_code=500,
-#             detail=f"Error reindexing: {str(e)}"
-#         )
\ No newline at end of file
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reindexing: {str(e)}"
+        )
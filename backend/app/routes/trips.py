@@ -0,0 +1,213 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
+from datetime import datetime
+from ..database import get_db
+from ..models import Trip, SeatHold, BusProvider
+from ..route_index import get_route_index
+from ..reservations import hold_seats, confirm_hold, release_hold, release_expired_holds
+from ..schemas import (
+    TripCreate, TripResponse, SeatHoldCreate, SeatHoldResponse, BookingResponse
+)
+
+router = APIRouter(prefix="/api/trips", tags=["trips"])
+
+
+def _trip_response(trip: Trip, provider_name: str) -> TripResponse:
+    return TripResponse(
+        id=trip.id,
+        bus_provider=provider_name,
+        from_district=trip.from_district,
+        to_district=trip.to_district,
+        travel_date=trip.travel_date,
+        departure_time=trip.departure_time,
+        total_seats=trip.total_seats,
+        available_seats=trip.available_seats
+    )
+
+
+def _hold_response(hold: SeatHold) -> SeatHoldResponse:
+    return SeatHoldResponse(
+        id=hold.id,
+        trip_id=hold.trip_id,
+        seats=hold.seats,
+        status=hold.status,
+        expires_at=hold.expires_at,
+        booking_id=hold.booking_id
+    )
+
+
+@router.post("", response_model=TripResponse)
+def create_trip(
+    trip_data: TripCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Schedule a trip: a provider's departure on a route and date, with its seat count
+    """
+    provider = db.query(BusProvider).filter(BusProvider.name == trip_data.bus_provider).first()
+    if not provider:
+        raise HTTPException(status_code=404, detail=f"Bus provider '{trip_data.bus_provider}' not found")
+
+    # Only routes the provider actually serves can be sold
+    index = get_route_index(db)
+    from_id = index.get_district_id(trip_data.from_district)
+    to_id = index.get_district_id(trip_data.to_district)
+    if from_id is None:
+        raise HTTPException(status_code=404, detail=f"District '{trip_data.from_district}' not found")
+    if to_id is None:
+        raise HTTPException(status_code=404, detail=f"District '{trip_data.to_district}' not found")
+    if from_id == to_id:
+        raise HTTPException(status_code=400, detail="From and to districts must be different")
+    if provider.name not in index.providers_between(from_id, to_id):
+        raise HTTPException(
+            status_code=400,
+            detail=f"{provider.name} does not run between {trip_data.from_district} and {trip_data.to_district}"
+        )
+
+    try:
+        datetime.strptime(trip_data.travel_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    trip = Trip(
+        bus_provider_id=provider.id,
+        from_district=trip_data.from_district,
+        to_district=trip_data.to_district,
+        travel_date=trip_data.travel_date,
+        departure_time=trip_data.departure_time,
+        total_seats=trip_data.total_seats,
+        available_seats=trip_data.total_seats
+    )
+    db.add(trip)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="This provider already has a trip at that departure")
+    db.refresh(trip)
+
+    return _trip_response(trip, provider.name)
+
+
+@router.get("", response_model=List[TripResponse])
+def search_trips(
+    from_district: str,
+    to_district: str,
+    travel_date: str = Query(..., description="Travel date (YYYY-MM-DD)"),
+    bus_provider: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Trips on a route and date with their available seats, by departure time
+    """
+    query = db.query(Trip, BusProvider.name).join(BusProvider, BusProvider.id == Trip.bus_provider_id).filter(
+        Trip.from_district == from_district,
+        Trip.to_district == to_district,
+        Trip.travel_date == travel_date
+    )
+    if bus_provider:
+        query = query.filter(BusProvider.name == bus_provider)
+    query = query.order_by(Trip.departure_time, Trip.id)
+
+    rows = query.all()
+    # Seats of expired holds count as available again
+    if rows and release_expired_holds(db, trip_ids=[trip.id for trip, _ in rows]):
+        db.commit()
+        rows = query.all()
+
+    return [_trip_response(trip, name) for trip, name in rows]
+
+
+@router.get("/{trip_id}", response_model=TripResponse)
+def get_trip(
+    trip_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a trip and its available seats
+    """
+    # Seats of expired holds count as available again
+    if release_expired_holds(db, trip_id):
+        db.commit()
+
+    row = db.query(Trip, BusProvider.name).join(BusProvider, BusProvider.id == Trip.bus_provider_id).filter(
+        Trip.id == trip_id
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Trip not found")
+
+    return _trip_response(*row)
+
+
+@router.post("/{trip_id}/holds", response_model=SeatHoldResponse)
+def create_hold(
+    trip_id: int,
+    hold_data: SeatHoldCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Hold seats on a trip. The seats are taken with a conditional decrement,
+    so concurrent requests can never oversell; the hold must be confirmed
+    before it expires (SEAT_HOLD_TTL_SECONDS), otherwise its seats go back.
+    """
+    # No read before the decrement: the trip is only looked up when it fails
+    hold = hold_seats(db, trip_id, hold_data.seats, hold_data.user_name, hold_data.phone)
+    if hold is None:
+        if not db.query(Trip.id).filter(Trip.id == trip_id).first():
+            raise HTTPException(status_code=404, detail="Trip not found")
+        raise HTTPException(status_code=409, detail=f"Not enough seats left for {hold_data.seats} passenger(s)")
+
+    return _hold_response(hold)
+
+
+@router.post("/holds/{hold_id}/confirm", response_model=BookingResponse)
+def confirm_seat_hold(
+    hold_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Confirm a hold: the booking is created and the hold marked confirmed
+    in one transaction. The booking covers all of the hold's seats.
+    """
+    row = db.query(SeatHold, Trip, BusProvider.name).join(Trip, Trip.id == SeatHold.trip_id).join(
+        BusProvider, BusProvider.id == Trip.bus_provider_id
+    ).filter(SeatHold.id == hold_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Hold not found")
+    hold, trip, provider_name = row
+
+    booking = confirm_hold(db, hold, trip)
+    if booking is None:
+        raise HTTPException(status_code=409, detail="Hold has expired or is no longer active")
+
+    return BookingResponse(
+        id=booking.id,
+        user_name=booking.user_name,
+        phone=booking.phone,
+        from_district=booking.from_district,
+        to_district=booking.to_district,
+        bus_provider=provider_name,
+        travel_date=booking.travel_date,
+        booking_date=booking.booking_date,
+        status=booking.status
+    )
+
+
+@router.delete("/holds/{hold_id}")
+def release_seat_hold(
+    hold_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Release a hold before it expires, returning its seats to the trip
+    """
+    hold = db.query(SeatHold).filter(SeatHold.id == hold_id).first()
+    if not hold:
+        raise HTTPException(status_code=404, detail="Hold not found")
+
+    if not release_hold(db, hold):
+        raise HTTPException(status_code=409, detail="Hold is no longer active")
+
+    return {"message": "Hold released successfully", "hold_id": hold_id}
@@ -31,6 +31,12 @@ class BusSearchRequest(BaseModel):
     from_district: str = Field(..., description="Origin district")
     to_district: str = Field(..., description="Destination district")
     max_price: Optional[int] = Field(None, description="Maximum price filter")
+    sort_by: Optional[str] = Field(
+        None, pattern=r'^(price|provider)$',
+        description="price: cheapest first; provider: by provider name (default: provider id, then price)"
+    )
+    limit: Optional[int] = Field(None, ge=1, le=1000, description="Results per page (default: all)")
+    cursor: Optional[str] = Field(None, description="X-Next-Cursor value from the previous page")
 
 
 class BusSearchResult(BaseModel):
@@ -41,6 +47,47 @@ class BusSearchResult(BaseModel):
     to_district: str
 
 
+class JourneySearchRequest(BaseModel):
+    from_district: str = Field(..., description="Origin district")
+    to_district: str = Field(..., description="Destination district")
+    max_transfers: int = Field(1, ge=0, le=3, description="Most bus changes per journey")
+    limit: int = Field(5, ge=1, le=20, description="Number of journeys, cheapest first")
+
+
+class JourneyLeg(BaseModel):
+    from_district: str
+    to_district: str
+    providers: List[str]
+    drop_point: str
+    price: int
+
+
+class Journey(BaseModel):
+    total_price: int
+    transfers: int
+    legs: List[JourneyLeg]
+
+
+class FareEntry(BaseModel):
+    from_district: str
+    to_district: str
+    price: int
+    providers: List[str]
+
+
+class FareStats(BaseModel):
+    count: int
+    min: float
+    median: float
+    max: float
+
+
+class FareMatrixResponse(BaseModel):
+    version: int
+    fares: List[FareEntry]
+    stats: Optional[FareStats] = None
+
+
 class BookingCreate(BaseModel):
     user_name: str = Field(..., min_length=2, description="User's full name")
     phone: str = Field(..., pattern=r'^\+?[0-9]{10,15}$', description="Phone number")
@@ -65,6 +112,63 @@ class BookingResponse(BaseModel):
         from_attributes = True
 
 
+class BookingBatchRequest(BaseModel):
+    bookings: List[BookingCreate] = Field(..., min_length=1, max_length=500, description="Bookings to create")
+    mode: str = Field(
+        "all_or_nothing",
+        pattern=r'^(all_or_nothing|partial)$',
+        description="all_or_nothing: create none if any row is invalid; partial: create the valid rows"
+    )
+
+
+class BookingBatchItemResult(BaseModel):
+    index: int
+    success: bool
+    booking: Optional[BookingResponse] = None
+    error: Optional[str] = None
+
+
+class BookingBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BookingBatchItemResult]
+
+
+class TripCreate(BaseModel):
+    bus_provider: str
+    from_district: str
+    to_district: str
+    travel_date: str = Field(..., description="Travel date in YYYY-MM-DD format")
+    departure_time: str = Field(..., pattern=r'^([01][0-9]|2[0-3]):[0-5][0-9]$', description="Departure time HH:MM")
+    total_seats: int = Field(..., ge=1, le=100, description="Seats on the bus")
+
+
+class TripResponse(BaseModel):
+    id: int
+    bus_provider: str
+    from_district: str
+    to_district: str
+    travel_date: str
+    departure_time: str
+    total_seats: int
+    available_seats: int
+
+
+class SeatHoldCreate(BaseModel):
+    user_name: str = Field(..., min_length=2, description="User's full name")
+    phone: str = Field(..., pattern=r'^\+?[0-9]{10,15}$', description="Phone number")
+    seats: int = Field(1, ge=1, le=10, description="Seats to hold")
+
+
+class SeatHoldResponse(BaseModel):
+    id: int
+    trip_id: int
+    seats: int
+    status: str
+    expires_at: datetime
+    booking_id: Optional[int] = None
+
+
 class ProviderQuestionRequest(BaseModel):
     question: str = Field(..., min_length=3, description="Question about bus providers")
 
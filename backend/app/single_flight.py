@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing: while a computation for a key is in flight, callers
+    with the same key wait for it and share its result (or exception)
+    instead of starting their own.
+    """
+
+    def __init__(self, on_coalesced=None):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.coalesced = 0
+        # Called with no arguments for every coalesced caller (e.g. a metrics counter)
+        self.on_coalesced = on_coalesced
+
+    def _record_coalesced(self, key):
+        self.coalesced += 1
+        if self.on_coalesced is not None:
+            self.on_coalesced()
+        logger.info(f"Coalesced with in-flight request: {key}")
+
+    def do(self, key, fn):
+        """
+        Run fn() once per key across concurrent threads
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._record_coalesced(key)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException as e:
+            # The leader was interrupted (e.g. SystemExit); followers must not
+            # take the missing result for an answer, nor exit themselves
+            call.error = RuntimeError(f"In-flight computation was interrupted: {e!r}")
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, coro_fn):
+        """
+        Await coro_fn() once per key across concurrent tasks of the event loop.
+        The computation runs as its own task, so a cancelled caller doesn't
+        cancel it for the others.
+        """
+        task = self._tasks.get(key)
+        if task is not None:
+            self._record_coalesced(key)
+        else:
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
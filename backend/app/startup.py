@@ -0,0 +1,211 @@
+import os
+import time
+import asyncio
+import threading
+import logging
+from sqlalchemy import text
+from .database import engine, SessionLocal
+from .route_index import get_route_index
+from .query_classifier import get_query_classifier
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "full" serves everything; "search" serves bus search and booking only and never loads the RAG stack
+APP_MODE = os.getenv("APP_MODE", "full").lower()
+# Load the RAG stack during warm-up ("true") or on the first chat request ("false")
+WARM_UP_RAG = os.getenv("WARM_UP_RAG", "true").lower() == "true"
+
+# How long the warm-up keeps retrying a dependency before marking it failed
+STARTUP_TIMEOUT_SECONDS = float(os.getenv("STARTUP_TIMEOUT_SECONDS", "120"))
+# How long shutdown waits for a warm-up step in progress (e.g. a model download) before leaving it behind
+WARM_UP_STOP_TIMEOUT_SECONDS = float(os.getenv("WARM_UP_STOP_TIMEOUT_SECONDS", "5"))
+
+# Set on shutdown, so retries stop waiting
+_stop = threading.Event()
+
+
+def retry_with_backoff(fn, name: str, timeout: float = STARTUP_TIMEOUT_SECONDS,
+                       initial_delay: float = 0.05, max_delay: float = 2.0):
+    """
+    Call fn() until it succeeds, sleeping 50 ms, 100 ms, 200 ms, ... (capped at
+    max_delay) between attempts. Raises the last error once the next attempt
+    would start after the timeout, or at once on shutdown.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            if time.monotonic() + delay > deadline or _stop.is_set():
+                logger.error(f"{name} not available after {attempt} attempts: {e}")
+                raise
+            logger.info(f"Waiting for {name} (attempt {attempt}, retry in {delay:.2f}s): {e}")
+            _stop.wait(delay)
+            delay = min(delay * 2, max_delay)
+            attempt += 1
+
+
+def check_database():
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+class Readiness:
+    """
+    Warm-up state of each startup component: pending, ready or failed,
+    with the time it took
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.components = {}
+
+    def set(self, name: str, status: str, seconds: float = None, error: str = None):
+        entry = {"status": status}
+        if seconds is not None:
+            entry["seconds"] = round(seconds, 3)
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self.components[name] = entry
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return bool(self.components) and all(c["status"] == "ready" for c in self.components.values())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.components.items()}
+
+
+readiness = Readiness()
+
+
+def _warm_route_index():
+    db = SessionLocal()
+    try:
+        get_route_index(db)
+    finally:
+        db.close()
+
+
+def _warm_rag():
+    """
+    Connect the vector store and load the embedding model, so the first
+    question doesn't pay for either
+    """
+    # Imported here: the RAG stack is only needed for chat
+    from .query_router import get_query_router
+    router = retry_with_backoff(get_query_router, "vector store")
+    router.rag_pipeline.embedding_function(["warm up"])
+    return router
+
+
+def warm_up_steps(mode: str = APP_MODE, warm_up_rag: bool = WARM_UP_RAG) -> list:
+    """
+    (component, warm-up function, components it needs) for a deployment mode
+    """
+    steps = [
+        ("database", lambda: retry_with_backoff(check_database, "database"), ()),
+        ("route_index", _warm_route_index, ("database",)),
+    ]
+    if mode != "search":
+        steps.append(("query_classifier", get_query_classifier, ()))
+        if warm_up_rag:
+            steps.append(("rag_pipeline", _warm_rag, ()))
+    return steps
+
+
+WARMUP_STEPS = warm_up_steps()
+
+
+def warm_up(steps=WARMUP_STEPS, max_retry_delay: float = 30.0):
+    """
+    Run the warm-up steps in order, recording each one's outcome in `readiness`.
+    A failed step doesn't stop the others (what it would have built is built
+    lazily on first use meanwhile); failed steps are retried with growing
+    pauses until everything is ready or the server shuts down.
+    """
+    delay = 1.0
+    while True:
+        for name, fn, needs in steps:
+            components = readiness.snapshot()
+            if components.get(name, {}).get("status") == "ready":
+                continue
+            missing = [need for need in needs if components[need]["status"] != "ready"]
+            if missing:
+                readiness.set(name, "failed", error=f"needs {', '.join(missing)}")
+                continue
+            started = time.monotonic()
+            try:
+                fn()
+                readiness.set(name, "ready", time.monotonic() - started)
+                logger.info(f"Warm-up: {name} ready in {time.monotonic() - started:.2f}s")
+            except Exception as e:
+                readiness.set(name, "failed", time.monotonic() - started, str(e))
+                logger.warning(f"Warm-up: {name} failed, will load on first use: {e}")
+        if readiness.ready or _stop.wait(delay):
+            return
+        delay = min(delay * 2, max_retry_delay)
+
+
+async def start_warm_up(steps=WARMUP_STEPS) -> asyncio.Task:
+    """
+    Run the warm-up in a worker thread without holding up startup; returns its task
+    """
+    _stop.clear()
+    for name, _, _ in steps:
+        readiness.set(name, "pending")
+    return asyncio.create_task(_run_in_daemon_thread(warm_up, steps))
+
+
+async def _run_in_daemon_thread(fn, *args):
+    """
+    Await fn(*args) run in a daemon thread. Unlike asyncio.to_thread (the
+    default executor is joined when the loop shuts down), a call that never
+    returns doesn't keep the process from exiting.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(result, error):
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def run():
+        result, error = None, None
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(settle, result, error)
+        except RuntimeError:
+            pass  # The loop is already closed, nobody is waiting
+
+    threading.Thread(target=run, name="warm-up", daemon=True).start()
+    return await future
+
+
+async def stop_warm_up(task: asyncio.Task, timeout: float = WARM_UP_STOP_TIMEOUT_SECONDS):
+    """
+    End warm-up retries and wait up to timeout for the step in progress to
+    return; a step hanging longer (a stuck connect or download) is left behind
+    so shutdown and reload don't hang with it
+    """
+    _stop.set()
+    try:
+        await asyncio.wait_for(task, timeout)
+    except asyncio.TimeoutError:
+        pending = [name for name, state in readiness.snapshot().items() if state["status"] != "ready"]
+        logger.warning(
+            f"Warm-up still running after {timeout:g}s, shutting down without it "
+            f"(not ready: {', '.join(pending) or 'none'})"
+        )
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import random
+import logging
+import numpy as np
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.query_classifier import QueryClassifier, QUERY_TYPES, QUERY_CLASSIFIER_PATH
+from app.param_extractor import DISTRICT_ALIASES
+from app.provider_matcher import PROVIDER_ALIASES
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUCKETS = 4096
+
+# Question templates per query type; {d1}/{d2} are districts, {p} a provider, {n} a price
+TEMPLATES = {
+    "route_search": [
+        "buses from {d1} to {d2}", "bus from {d1} to {d2}", "{d1} to {d2}", "{d1} to {d2} bus",
+        "which buses go from {d1} to {d2}", "which buses go to {d2}", "show me buses from {d1} to {d2}",
+        "are there any buses from {d1} to {d2} under {n} taka", "{d1} to {d2} under {n}",
+        "buses from {d1} to {d2} below {n} tk", "cheapest bus from {d1} to {d2}",
+        "what is the fare from {d1} to {d2}", "how much is the ticket from {d1} to {d2}",
+        "price of bus ticket {d1} {d2}", "i want to go to {d2} from {d1}", "i need to travel to {d2}",
+        "does {p} go to {d2}", "does {p} operate from {d1} to {d2}", "{p} buses from {d1} to {d2}",
+        "is there a {p} bus to {d2}", "list all providers from {d1} to {d2}", "show all buses to {d2}",
+        "which providers operate between {d1} and {d2}", "buses between {d1} and {d2}",
+        "any bus to {d2} tomorrow", "available buses {d1} {d2}", "trip from {d1} to {d2} within {n} taka",
+        "journey to {d2} from {d1}", "what buses leave {d1} for {d2}", "route from {d1} to {d2}",
+        "how can i get to {d2} from {d1} by bus", "bus ticket to {d2}", "{d1} theke {d2} bus",
+        "{d1} থেকে {d2} বাস", "{d1} থেকে {d2} যাওয়ার বাস {n} টাকার মধ্যে", "{d2} যাওয়ার বাস আছে",
+        "cheap buses to {d2} under {n}", "max {n} taka {d1} to {d2}", "drop points in {d2}",
+        "where does the bus to {d2} stop", "which buses cover {d2}", "bus schedule {d1} to {d2}",
+    ],
+    "provider_info": [
+        "{p} contact number", "what is the contact number of {p}", "how do i contact {p}",
+        "{p} phone number", "give me {p} phone", "call {p}", "{p} hotline", "{p} customer care number",
+        "email of {p}", "{p} email address", "what is the address of {p}", "{p} address",
+        "where is {p} office", "{p} office location", "where is the {p} counter", "{p} counter number",
+        "tell me about {p}", "information about {p}", "details of {p}", "{p} details",
+        "{p} privacy policy", "what is the privacy policy of {p}", "how does {p} use my data",
+        "does {p} share my personal data", "{p} refund policy", "refund policy", "cancellation policy",
+        "what is the cancellation policy of {p}", "can i get a refund from {p}", "baggage policy",
+        "how much baggage can i carry on {p}", "does {p} offer discounts", "any discount on {p}",
+        "{p} terms and conditions", "{p} website", "what is {p}'s website", "contact details of {p} and {p2}",
+        "compare {p} and {p2} address", "which company is {p}", "who owns {p}",
+        "{p} এর ঠিকানা", "{p} এর ফোন নম্বর", "{p} যোগাযোগ", "privacy policy of the bus company",
+        "how are my booking details stored", "is my data safe with {p}", "is there a refund if i cancel",
+        "can i cancel my ticket", "what happens if i miss the bus", "do i get my money back if i cancel",
+    ],
+    "general": [
+        "hello", "hi", "hi there", "hey", "good morning", "good evening", "thanks", "thank you",
+        "thank you so much", "ok", "okay thanks", "bye", "goodbye", "who are you", "what can you do",
+        "how does this work", "help", "can you help me", "what is this website", "how are you",
+        "nice", "great", "cool", "what services do you offer", "i have a question", "are you a bot",
+        "how do i use this app", "what languages do you speak", "হ্যালো", "ধন্যবাদ", "আপনি কে",
+        "who made you", "tell me a joke", "what time is it", "is anyone there", "test",
+    ],
+}
+
+PRICES = ["300", "400", "500", "600", "700", "800", "1000", "1200", "1,500", "৫০০"]
+
+
+def _names(aliases: dict) -> list:
+    return [name for canonical, others in aliases.items() for name in [canonical] + others]
+
+
+def training_set(examples_per_template: int = 12, seed: int = 7) -> tuple:
+    """
+    (questions, labels) generated from the templates with random entities and casing
+    """
+    rng = random.Random(seed)
+    districts = _names(DISTRICT_ALIASES)
+    providers = _names(PROVIDER_ALIASES)
+    questions, labels = [], []
+    for label, templates in TEMPLATES.items():
+        for template in templates:
+            count = examples_per_template if "{" in template else 3
+            for _ in range(count):
+                d1, d2 = rng.sample(districts, 2)
+                p, p2 = rng.sample(providers, 2)
+                question = template.format(d1=d1, d2=d2, p=p, p2=p2, n=rng.choice(PRICES))
+                if rng.random() < 0.5:
+                    question = question.capitalize()
+                if rng.random() < 0.4:
+                    question += rng.choice(["?", "!", ".", " please", "?"])
+                questions.append(question)
+                labels.append(QUERY_TYPES.index(label))
+    return questions, np.array(labels, dtype=np.int64)
+
+
+def train(questions: list, labels: np.ndarray, buckets: int = BUCKETS, epochs: int = 300,
+          learning_rate: float = 0.5, l2: float = 1e-4) -> QueryClassifier:
+    """
+    Full-batch gradient descent on the softmax cross-entropy
+    """
+    model = QueryClassifier(np.zeros((buckets, len(QUERY_TYPES))), np.zeros(len(QUERY_TYPES)))
+    x = np.zeros((len(questions), buckets), dtype=np.float32)
+    np.add.at(x, model.features(questions), 1.0)
+    y = np.eye(len(QUERY_TYPES), dtype=np.float32)[labels]
+
+    weights = np.zeros((buckets, len(QUERY_TYPES)), dtype=np.float32)
+    bias = np.zeros(len(QUERY_TYPES), dtype=np.float32)
+    for epoch in range(epochs):
+        logits = x @ weights + bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - y) / len(questions)
+        weights -= learning_rate * (x.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+        if epoch % 100 == 0 or epoch == epochs - 1:
+            loss = -np.log(np.maximum((probabilities * y).sum(axis=1), 1e-12)).mean()
+            logger.info(f"epoch {epoch}: loss {loss:.4f}")
+
+    return QueryClassifier(weights, bias)
+
+
+def main(path: str = QUERY_CLASSIFIER_PATH):
+    questions, labels = training_set()
+    order = np.random.default_rng(0).permutation(len(questions))
+    split = int(len(order) * 0.8)
+    train_rows, test_rows = order[:split], order[split:]
+
+    model = train([questions[i] for i in train_rows], labels[train_rows])
+    predicted = model.classify_batch([questions[i] for i in test_rows])
+    accuracy = np.mean([QUERY_TYPES.index(p) == labels[i] for p, i in zip(predicted, test_rows)])
+    logger.info(f"Held-out accuracy: {accuracy:.3f} on {len(test_rows)} questions")
+
+    # Ship the model trained on everything
+    model = train(questions, labels)
+    model.save(path)
+    print(json.dumps({"path": path, "examples": len(questions), "held_out_accuracy": round(float(accuracy), 4)}))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,357 @@
+import os
+import re
+import json
+import zlib
+import asyncio
+import threading
+import logging
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "chroma" (chromadb HTTP server) or "local" (in-process NumPy store)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()
+VECTOR_STORE_PATH = os.getenv(
+    "VECTOR_STORE_PATH",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'vector_store')
+)
+
+# "default" (chromadb's MiniLM ONNX model) or "hashing" (offline, no model download)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "default").lower()
+
+COLLECTION_NAME = "bus_providers"
+COLLECTION_METADATA = {"description": "Bus provider information and policies"}
+
+
+def _matches(metadata: dict, where: dict) -> bool:
+    """
+    Evaluate a chroma-style metadata filter ($eq, $ne, $in, $nin, $and, $or)
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class HashingEmbeddingFunction:
+    """
+    Deterministic feature-hashing embeddings of word unigrams and bigrams.
+    Needs no model download, so offline runs and benchmarks can embed; it is
+    not meant to match the retrieval quality of the default model.
+    """
+
+    _word = re.compile(r"\w+")
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def __call__(self, input: list) -> list:
+        vectors = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            words = self._word.findall((text or "").lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                # Sign from a high bit keeps collisions from only ever adding up
+                vector[digest % self.dimensions] += 1.0 if digest & 0x80000000 else -1.0
+            vectors.append(vector)
+        return vectors
+
+
+def get_embedding_function():
+    """
+    Embedding function for documents and queries on the configured backend
+    """
+    if EMBEDDING_BACKEND == "hashing":
+        return HashingEmbeddingFunction()
+
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+    return DefaultEmbeddingFunction()
+
+
+class LocalCollection:
+    """
+    In-process vector store with the chromadb collection surface the RAG pipeline uses.
+    Normalized embeddings live in a memory-mapped .npy matrix; ids, documents and
+    metadatas live in parallel arrays in a JSON sidecar. Queries are exact top-k
+    over a single matrix-vector product.
+    """
+
+    def __init__(self, path: str, embedding_function, name: str = COLLECTION_NAME):
+        self.name = name
+        self.path = path
+        self.embedding_function = embedding_function
+        self._matrix_file = os.path.join(path, f"{name}.npy")
+        self._records_file = os.path.join(path, f"{name}.json")
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self._matrix_file) and os.path.exists(self._records_file):
+            matrix = np.load(self._matrix_file, mmap_mode="r")
+            with open(self._records_file, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+            records = {"ids": [], "documents": [], "metadatas": []}
+        # Swapped as one tuple so readers always see a consistent snapshot
+        self._data = (matrix, records["ids"], records["documents"], records["metadatas"])
+        self._positions = {id_: i for i, id_ in enumerate(records["ids"])}
+
+    def reload(self):
+        """
+        Re-read the store from disk, e.g. after another process reindexed it
+        """
+        with self._lock:
+            self._load()
+
+    def _save(self, matrix: np.ndarray, ids: list, documents: list, metadatas: list):
+        tmp_matrix = self._matrix_file + ".tmp.npy"
+        tmp_records = self._records_file + ".tmp"
+        np.save(tmp_matrix, matrix.astype(np.float32))
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "documents": documents, "metadatas": metadatas}, f, ensure_ascii=False)
+        os.replace(tmp_matrix, self._matrix_file)
+        os.replace(tmp_records, self._records_file)
+        self._load()
+
+    def _embed(self, texts: list) -> np.ndarray:
+        vectors = np.asarray(self.embedding_function(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def count(self) -> int:
+        return len(self._data[1])
+
+    def add(self, ids: list, documents: list, metadatas: list = None, embeddings=None):
+        """
+        Add documents; ids that already exist are skipped, as chromadb does
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            matrix, old_ids, old_documents, old_metadatas = self._data
+            new = [i for i, id_ in enumerate(ids) if id_ not in self._positions]
+            if len(new) < len(ids):
+                logger.warning(f"Skipping {len(ids) - len(new)} documents with existing ids")
+            if not new:
+                return
+            if embeddings is not None:
+                vectors = np.asarray([embeddings[i] for i in new], dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            else:
+                vectors = self._embed([documents[i] for i in new])
+            matrix = np.vstack([matrix, vectors]) if len(old_ids) else vectors
+            self._save(
+                matrix,
+                old_ids + [ids[i] for i in new],
+                old_documents + [documents[i] for i in new],
+                old_metadatas + [metadatas[i] for i in new]
+            )
+
+    def upsert(self, ids: list, documents: list, metadatas: list = None, embeddings=None):
+        """
+        Insert new documents and replace existing ones with the same ids
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        if embeddings is not None:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        else:
+            vectors = self._embed(documents)
+        with self._lock:
+            matrix, old_ids, old_documents, old_metadatas = self._data
+            matrix = np.array(matrix) if len(old_ids) else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            new_ids, new_documents, new_metadatas = list(old_ids), list(old_documents), list(old_metadatas)
+            appended = []
+            for id_, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                position = self._positions.get(id_)
+                if position is None:
+                    new_ids.append(id_)
+                    new_documents.append(document)
+                    new_metadatas.append(metadata)
+                    appended.append(vector)
+                else:
+                    matrix[position] = vector
+                    new_documents[position] = document
+                    new_metadatas[position] = metadata
+            if appended:
+                matrix = np.vstack([matrix, np.asarray(appended)])
+            self._save(matrix, new_ids, new_documents, new_metadatas)
+
+    def delete(self, ids: list = None, where: dict = None):
+        """
+        Delete documents by id and/or metadata filter
+        """
+        with self._lock:
+            matrix, old_ids, old_documents, old_metadatas = self._data
+            drop = set(ids or [])
+            if where:
+                drop.update(id_ for id_, meta in zip(old_ids, old_metadatas) if _matches(meta, where))
+            keep = [i for i, id_ in enumerate(old_ids) if id_ not in drop]
+            if len(keep) == len(old_ids):
+                return
+            self._save(
+                np.asarray(matrix)[keep] if keep else np.zeros((0, matrix.shape[1]), dtype=np.float32),
+                [old_ids[i] for i in keep],
+                [old_documents[i] for i in keep],
+                [old_metadatas[i] for i in keep]
+            )
+
+    def get(self, ids: list = None, where: dict = None, include: list = None) -> dict:
+        """
+        Fetch documents by id and/or metadata filter (all documents if neither is given)
+        """
+        _, all_ids, documents, metadatas = self._data
+        if ids is not None:
+            positions = [self._positions[id_] for id_ in ids if id_ in self._positions]
+        else:
+            positions = range(len(all_ids))
+        if where:
+            positions = [i for i in positions if _matches(metadatas[i], where)]
+        return {
+            "ids": [all_ids[i] for i in positions],
+            "documents": [documents[i] for i in positions],
+            "metadatas": [metadatas[i] for i in positions],
+        }
+
+    def query(self, query_texts: list = None, query_embeddings: list = None, n_results: int = 10,
+              where: dict = None, include: list = None) -> dict:
+        """
+        Exact nearest neighbours by cosine similarity. Distances are 1 - cosine.
+        """
+        matrix, ids, documents, metadatas = self._data
+        if query_embeddings is not None:
+            queries = np.asarray(query_embeddings, dtype=np.float32)
+            queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        else:
+            queries = self._embed(query_texts)
+
+        candidates = None
+        if where:
+            candidates = np.array([i for i, meta in enumerate(metadatas) if _matches(meta, where)], dtype=np.int64)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query in queries:
+            if not ids:
+                top, scores = np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+            elif candidates is not None:
+                scores = matrix[candidates] @ query
+                k = min(n_results, len(candidates))
+                order = np.argsort(-scores)[:k]
+                top, scores = candidates[order], scores[order]
+            else:
+                scores = matrix @ query
+                k = min(n_results, len(ids))
+                top = np.argpartition(-scores, k - 1)[:k] if k < len(ids) else np.arange(len(ids))
+                top = top[np.argsort(-scores[top])]
+                scores = scores[top]
+            result["ids"].append([ids[i] for i in top])
+            result["documents"].append([documents[i] for i in top])
+            result["metadatas"].append([metadatas[i] for i in top])
+            result["distances"].append([float(1.0 - s) for s in scores])
+        return result
+
+
+class AsyncLocalCollection:
+    """
+    Awaitable facade over LocalCollection, matching chromadb's async collection.
+    Every call runs in a worker thread: queries embed their texts and take the
+    collection lock, neither of which may block the event loop.
+    """
+
+    def __init__(self, collection: LocalCollection):
+        self.collection = collection
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(self.collection.count)
+
+    async def add(self, **kwargs):
+        return await asyncio.to_thread(self.collection.add, **kwargs)
+
+    async def query(self, **kwargs) -> dict:
+        return await asyncio.to_thread(self.collection.query, **kwargs)
+
+    async def upsert(self, **kwargs):
+        return await asyncio.to_thread(self.collection.upsert, **kwargs)
+
+    async def delete(self, **kwargs):
+        return await asyncio.to_thread(self.collection.delete, **kwargs)
+
+    async def get(self, **kwargs) -> dict:
+        return await asyncio.to_thread(self.collection.get, **kwargs)
+
+
+# Local collections are shared by sync and async callers in the process
+_local_collection = None
+
+
+def _get_local_collection(embedding_function) -> LocalCollection:
+    global _local_collection
+    if _local_collection is None:
+        _local_collection = LocalCollection(VECTOR_STORE_PATH, embedding_function)
+        logger.info(f"Local vector store opened at {VECTOR_STORE_PATH} ({_local_collection.count()} documents)")
+    return _local_collection
+
+
+def open_collection(embedding_function):
+    """
+    Get or create the provider document collection on the configured backend
+    """
+    if VECTOR_STORE_BACKEND == "local":
+        return _get_local_collection(embedding_function)
+
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.HttpClient(
+        host=os.getenv("CHROMA_HOST", "localhost"),
+        port=int(os.getenv("CHROMA_PORT", "8000")),
+        settings=Settings(anonymized_telemetry=False)
+    )
+    return client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        metadata=COLLECTION_METADATA,
+        embedding_function=embedding_function
+    )
+
+
+async def open_async_collection(embedding_function):
+    """
+    Async version of open_collection
+    """
+    if VECTOR_STORE_BACKEND == "local":
+        return AsyncLocalCollection(_get_local_collection(embedding_function))
+
+    import chromadb
+    from chromadb.config import Settings
+
+    client = await chromadb.AsyncHttpClient(
+        host=os.getenv("CHROMA_HOST", "localhost"),
+        port=int(os.getenv("CHROMA_PORT", "8000")),
+        settings=Settings(anonymized_telemetry=False)
+    )
+    return await client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        metadata=COLLECTION_METADATA,
+        embedding_function=embedding_function
+    )
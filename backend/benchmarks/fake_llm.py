@@ -0,0 +1,128 @@
+"""
+OpenAI-compatible chat completions stand-in for offline benchmarks.
+
+    python -m benchmarks.fake_llm --port 9100 --latency-ms 300 --tokens-per-second 50
+
+Every call waits `latency-ms` (time to first token) and then one token per
+1/tokens-per-second, streamed or not. Parameter extraction prompts get a JSON
+answer built from the district names in the question, everything else a
+filler answer of `completion-tokens` tokens.
+"""
+import re
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DISTRICTS = [
+    "Dhaka", "Chattogram", "Khulna", "Rajshahi", "Sylhet",
+    "Barishal", "Rangpur", "Mymensingh", "Comilla", "Bogra",
+]
+_QUESTION = re.compile(r"^Question: (.*)$", re.MULTILINE)
+_PRICE = re.compile(r"(\d{3,5})")
+_FILLER = "The bus operates daily with air conditioned coaches and counters in every major district".split()
+
+
+def extraction_answer(prompt: str) -> str:
+    """
+    Route parameters for an extraction prompt, found by name in the question
+    """
+    match = _QUESTION.search(prompt)
+    question = match.group(1) if match else prompt
+    found = sorted(
+        (question.lower().find(name.lower()), name) for name in DISTRICTS if name.lower() in question.lower()
+    )
+    price = _PRICE.search(question)
+    return json.dumps({
+        "from_district": found[0][1] if found else None,
+        "to_district": found[1][1] if len(found) > 1 else None,
+        "max_price": int(price.group(1)) if price else None,
+    })
+
+
+def create_app(latency_ms: float, tokens_per_second: float, completion_tokens: int) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+    token_delay = 1.0 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    def answer_tokens(body: dict) -> list:
+        prompt = body["messages"][-1]["content"]
+        if prompt.startswith("Extract bus search parameters"):
+            return [extraction_answer(prompt)]
+        n = min(completion_tokens, body.get("max_tokens") or completion_tokens)
+        return [(" " if i else "") + _FILLER[i % len(_FILLER)] for i in range(n)]
+
+    def usage(body: dict, tokens: list) -> dict:
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        tokens = answer_tokens(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+
+        if body.get("stream"):
+            async def events():
+                await asyncio.sleep(latency_ms / 1000)
+                for token in tokens:
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(token_delay)
+                done = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency_ms / 1000 + token_delay * len(tokens))
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": usage(body, tokens),
+        })
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=300, help="time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="generation speed (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=60, help="length of non-JSON answers")
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.tokens_per_second, args.completion_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Seat reservation throughput on a single hot trip.
+
+    python -m benchmarks.hot_trip --concurrency 1,8,32 --duration 10
+
+Starts the backend in search-only mode against a fresh SQLite database (or
+--database-url) and, per concurrency level, runs two phases on one trip:
+- sellout: many more hold+confirm attempts than seats; checks that exactly
+  `seats` bookings succeed (no overselling) and reports how fast the bus sells out
+- churn: every worker repeatedly holds a seat, confirms it and cancels the
+  booking, keeping the trip full of contention for --duration seconds;
+  reports sustained confirmed bookings per second and latencies
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+import numpy as np
+from .run import BACKEND_DIR, free_port, wait_until_up
+
+PASSENGER = {"user_name": "Bench User", "phone": "01710000000", "seats": 1}
+
+
+async def purchase(client: httpx.AsyncClient, trip_id: int, latencies: dict):
+    """
+    Hold one seat and confirm it; returns the booking id or None if sold out
+    """
+    started = time.perf_counter()
+    hold = await client.post(f"/api/trips/{trip_id}/holds", json=PASSENGER)
+    latencies["hold"].append(time.perf_counter() - started)
+    if hold.status_code == 409:
+        return None
+    hold.raise_for_status()
+
+    started = time.perf_counter()
+    booking = await client.post(f"/api/trips/holds/{hold.json()['id']}/confirm")
+    latencies["confirm"].append(time.perf_counter() - started)
+    booking.raise_for_status()
+    return booking.json()["id"]
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {"p50_ms": None, "p95_ms": None}
+    p50, p95 = np.percentile(np.asarray(values) * 1000, [50, 95])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2)}
+
+
+async def sellout(base_url: str, trip_id: int, seats: int, concurrency: int, attempts: int) -> dict:
+    latencies = {"hold": [], "confirm": []}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    remaining = attempts
+    sold = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal remaining, sold
+            while remaining > 0:
+                remaining -= 1
+                if await purchase(client, trip_id, latencies) is not None:
+                    sold += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        available = (await client.get(f"/api/trips/{trip_id}")).json()["available_seats"]
+
+    if sold != seats or available != 0:
+        raise RuntimeError(f"Oversold or undersold: {sold} bookings for {seats} seats, {available} left")
+    return {
+        "phase": "sellout", "concurrency": concurrency, "seats": seats, "attempts": attempts,
+        "confirmed": sold, "rejected": attempts - sold, "seconds": round(elapsed, 3),
+        "bookings_per_s": round(sold / elapsed, 1),
+        "hold": _percentiles(latencies["hold"]), "confirm": _percentiles(latencies["confirm"]),
+    }
+
+
+async def churn(base_url: str, trip_id: int, seats: int, concurrency: int, duration: float) -> dict:
+    latencies = {"hold": [], "confirm": []}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    confirmed = rejected = 0
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal confirmed, rejected
+            while time.perf_counter() < deadline:
+                booking_id = await purchase(client, trip_id, latencies)
+                if booking_id is None:
+                    rejected += 1
+                    continue
+                confirmed += 1
+                (await client.delete(f"/api/bookings/{booking_id}")).raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        available = (await client.get(f"/api/trips/{trip_id}")).json()["available_seats"]
+
+    if available != seats:
+        raise RuntimeError(f"Seats leaked: {available} of {seats} available after every booking was cancelled")
+    return {
+        "phase": "churn", "concurrency": concurrency, "seats": seats, "confirmed": confirmed,
+        "rejected": rejected, "seconds": round(elapsed, 3), "bookings_per_s": round(confirmed / elapsed, 1),
+        "hold": _percentiles(latencies["hold"]), "confirm": _percentiles(latencies["confirm"]),
+    }
+
+
+def create_trip(base_url: str, seats: int, departure: int) -> int:
+    response = httpx.post(f"{base_url}/api/trips", json={
+        "bus_provider": "Hanif", "from_district": "Dhaka", "to_district": "Khulna",
+        "travel_date": "2030-04-10", "departure_time": f"{departure // 60:02d}:{departure % 60:02d}",
+        "total_seats": seats,
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot trip reservation benchmark")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--seats", type=int, default=40, help="seats on the hot trip")
+    parser.add_argument("--oversubscription", type=int, default=5, help="sellout attempts per seat")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of churn per concurrency level")
+    parser.add_argument("--database-url", help="database to seed and use (default: fresh SQLite file)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    workdir = tempfile.mkdtemp(prefix="bus-hot-trip-")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        VECTOR_STORE_BACKEND="local",
+        VECTOR_STORE_PATH=os.path.join(workdir, "vector_store"),
+        EMBEDDING_BACKEND="hashing",
+        APP_MODE="search",
+        PYTHONPATH=BACKEND_DIR,
+    )
+    process = None
+    results = []
+    try:
+        subprocess.run([sys.executable, "-m", "app.seed_data"], cwd=BACKEND_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        )
+        wait_until_up(f"{base_url}/ready")
+
+        # Every phase gets its own trip (a new departure time on the same route)
+        departure = 6 * 60
+        for concurrency in levels:
+            trip_id = create_trip(base_url, args.seats, departure)
+            departure += 1
+            results.append(asyncio.run(
+                sellout(base_url, trip_id, args.seats, concurrency, args.seats * args.oversubscription)
+            ))
+            trip_id = create_trip(base_url, args.seats, departure)
+            departure += 1
+            results.append(asyncio.run(churn(base_url, trip_id, args.seats, concurrency, args.duration)))
+            for r in results[-2:]:
+                print(f"{r['phase']} x{concurrency}: {r['bookings_per_s']} bookings/s", file=sys.stderr)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    header = (f"{'phase':<9}{'conc':>6}{'seats':>7}{'confirmed':>11}{'rejected':>10}{'bookings/s':>12}"
+              f"{'hold p50':>10}{'hold p95':>10}{'conf p50':>10}{'conf p95':>10}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['phase']:<9}{r['concurrency']:>6}{r['seats']:>7}{r['confirmed']:>11}{r['rejected']:>10}"
+            f"{r['bookings_per_s']:>12.1f}{r['hold']['p50_ms'] or 0:>10.2f}{r['hold']['p95_ms'] or 0:>10.2f}"
+            f"{r['confirm']['p50_ms'] or 0:>10.2f}{r['confirm']['p95_ms'] or 0:>10.2f}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
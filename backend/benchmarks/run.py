@@ -0,0 +1,261 @@
+"""
+Offline load test of the backend API.
+
+    python -m benchmarks.run --concurrency 1,8,32 --requests 200
+
+Starts the fake LLM server and the backend (uvicorn) against a fresh SQLite
+database seeded from data/data.json and the local vector store, then drives
+each endpoint at each concurrency level and reports p50/p95/p99 latency and
+requests per second. Nothing talks to OpenRouter or ChromaDB.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE = os.path.join(BACKEND_DIR, "data", "data.json")
+
+ENDPOINTS = ("search", "book", "history", "ask")
+
+ASK_QUESTIONS = [
+    "Which buses go from Dhaka to Sylhet under 700 taka?",
+    "Are there any buses from Dhaka to Rajshahi under 500 taka?",
+    "Show me buses from Chattogram to Dhaka",
+    "What is the contact number of Hanif?",
+    "Give me the address of Green Line",
+    "What is the privacy policy of Shyamoli?",
+    "Tell me about Soudia",
+    "What is the refund policy?",
+    "Hello, how does this work?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+class Workload:
+    """
+    Reproducible request generators built from data/data.json
+    """
+
+    def __init__(self, seed: int, phones: int = 20):
+        with open(DATA_FILE, "r") as f:
+            data = json.load(f)
+        self.random = random.Random(seed)
+        self.districts = [d["name"] for d in data["districts"]]
+        self.routes = [
+            (provider["name"], origin, destination)
+            for provider in data["bus_providers"]
+            for origin in provider["coverage_districts"]
+            for destination in provider["coverage_districts"]
+            if origin != destination
+        ]
+        self.phones = [f"0171{i:07d}" for i in range(phones)]
+
+    def booking(self) -> dict:
+        provider, origin, destination = self.random.choice(self.routes)
+        return {
+            "user_name": "Bench User",
+            "phone": self.random.choice(self.phones),
+            "from_district": origin,
+            "to_district": destination,
+            "bus_provider": provider,
+            "travel_date": f"2030-{self.random.randint(1, 12):02d}-{self.random.randint(1, 28):02d}",
+        }
+
+    def request(self, endpoint: str) -> tuple:
+        """
+        (method, path, json body) for one request to an endpoint
+        """
+        if endpoint == "search":
+            origin, destination = self.random.sample(self.districts, 2)
+            body = {"from_district": origin, "to_district": destination}
+            if self.random.random() < 0.5:
+                body["max_price"] = self.random.choice([400, 600, 800, 1000])
+            return "POST", "/api/buses/search", body
+        if endpoint == "book":
+            return "POST", "/api/bookings", self.booking()
+        if endpoint == "history":
+            return "GET", f"/api/bookings/{self.random.choice(self.phones)}", None
+        if endpoint == "ask":
+            return "POST", "/api/providers/ask", {"question": self.random.choice(ASK_QUESTIONS)}
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+async def drive(base_url: str, workload: Workload, endpoint: str, concurrency: int, total: int,
+                warmup: int) -> dict:
+    """
+    Send `total` requests to an endpoint from `concurrency` workers
+    """
+    requests = [workload.request(endpoint) for _ in range(warmup + total)]
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        for method, path, body in requests[:warmup]:
+            await client.request(method, path, json=body)
+
+        queue = asyncio.Queue()
+        for item in requests[warmup:]:
+            queue.put_nowait(item)
+
+        async def worker():
+            nonlocal errors
+            while True:
+                try:
+                    method, path, body = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+def seed_bookings(base_url: str, workload: Workload, per_phone: int):
+    """
+    Give every benchmark phone number a booking history
+    """
+    rows = [dict(workload.booking(), phone=phone) for phone in workload.phones for _ in range(per_phone)]
+    for start in range(0, len(rows), 500):
+        response = httpx.post(
+            f"{base_url}/api/bookings/batch", json={"bookings": rows[start:start + 500]}, timeout=60.0
+        )
+        response.raise_for_status()
+
+
+def print_table(results: list):
+    header = f"{'endpoint':<10}{'conc':>6}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['endpoint']:<10}{r['concurrency']:>6}{r['requests']:>7}{r['errors']:>6}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['rps']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline API benchmark")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"comma-separated subset of {ENDPOINTS}")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests before each run")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the request mix")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="fake LLM time to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=50, help="fake LLM generation speed")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the answer cache on for /ask")
+    parser.add_argument("--database-url", help="database to seed and use (default: fresh SQLite file)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    workdir = tempfile.mkdtemp(prefix="bus-bench-")
+    llm_port, api_port = free_port(), free_port()
+    base_url = f"http://127.0.0.1:{api_port}"
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        VECTOR_STORE_BACKEND="local",
+        VECTOR_STORE_PATH=os.path.join(workdir, "vector_store"),
+        EMBEDDING_BACKEND="hashing",
+        LLM_BASE_URL=f"http://127.0.0.1:{llm_port}/v1",
+        llm_API_KEY="bench",
+        xAI_API_KEY="bench",
+        ANSWER_CACHE_ENABLED="true" if args.answer_cache else "false",
+        PYTHONPATH=BACKEND_DIR,
+    )
+    processes = []
+    try:
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(llm_port),
+             "--latency-ms", str(args.llm_latency_ms), "--tokens-per-second", str(args.llm_tokens_per_second)],
+            cwd=BACKEND_DIR, env=env
+        ))
+        subprocess.run([sys.executable, "-m", "app.seed_data"], cwd=BACKEND_DIR, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(api_port),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        ))
+        wait_until_up(f"http://127.0.0.1:{llm_port}/health")
+        wait_until_up(f"{base_url}/ready")
+
+        workload = Workload(args.seed)
+        if "history" in endpoints:
+            seed_bookings(base_url, workload, per_phone=50)
+
+        results = []
+        for endpoint in endpoints:
+            for concurrency in levels:
+                result = asyncio.run(drive(base_url, workload, endpoint, concurrency, args.requests, args.warmup))
+                results.append(result)
+                print(f"{endpoint} x{concurrency}: p50 {result['p50_ms']} ms, {result['rps']} rps", file=sys.stderr)
+
+        print_table(results)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump({"config": vars(args), "results": results}, f, indent=2)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
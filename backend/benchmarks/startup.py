@@ -0,0 +1,160 @@
+"""
+Startup cost of the backend per deployment mode.
+
+    python -m benchmarks.startup --runs 5
+
+For each configuration, measures in fresh processes:
+- import: time and peak memory of `import app.main`
+- boot: time until /health answers and until /ready reports every component warm
+- rss: resident memory of the server once ready
+- first ask: latency of the first /api/providers/ask (fake LLM), which pays for
+  the RAG stack when it wasn't warmed up
+Runs against a fresh SQLite database, the local vector store and hashing embeddings.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import httpx
+import numpy as np
+from .run import BACKEND_DIR, free_port, wait_until_up
+
+# name -> environment overrides
+CONFIGURATIONS = {
+    "full": {"APP_MODE": "full", "WARM_UP_RAG": "true"},
+    "full-lazy-rag": {"APP_MODE": "full", "WARM_UP_RAG": "false"},
+    "search": {"APP_MODE": "search"},
+}
+
+IMPORT_PROBE = (
+    "import time, resource; started = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def rss_mb(pid: int):
+    """
+    Resident memory of a process in MB (Linux only, None elsewhere)
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def measure_import(env: dict) -> tuple:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    # ru_maxrss is in KB on Linux
+    return float(output[0]), int(output[1]) / 1024
+
+
+def measure_boot(env: dict, ask: bool) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(f"{base_url}/health", timeout=120.0)
+        health = time.perf_counter() - started
+        wait_until_up(f"{base_url}/ready", timeout=120.0)
+        ready = time.perf_counter() - started
+        result = {"health_s": health, "ready_s": ready, "rss_mb": rss_mb(process.pid)}
+        if ask:
+            ask_started = time.perf_counter()
+            response = httpx.post(
+                f"{base_url}/api/providers/ask", json={"question": "What is the contact number of Hanif?"},
+                timeout=120.0
+            )
+            response.raise_for_status()
+            result["first_ask_s"] = time.perf_counter() - ask_started
+        return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per configuration")
+    parser.add_argument("--configurations", default=",".join(CONFIGURATIONS),
+                        help=f"comma-separated subset of {tuple(CONFIGURATIONS)}")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bus-startup-")
+    llm_port = free_port()
+    base_env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        VECTOR_STORE_BACKEND="local",
+        VECTOR_STORE_PATH=os.path.join(workdir, "vector_store"),
+        EMBEDDING_BACKEND="hashing",
+        LLM_BASE_URL=f"http://127.0.0.1:{llm_port}/v1",
+        llm_API_KEY="bench",
+        xAI_API_KEY="bench",
+        ANSWER_CACHE_ENABLED="false",
+        PYTHONPATH=BACKEND_DIR,
+    )
+    fake_llm = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(llm_port), "--latency-ms", "0",
+         "--tokens-per-second", "0"],
+        cwd=BACKEND_DIR, env=base_env
+    )
+    results = []
+    try:
+        subprocess.run([sys.executable, "-m", "app.seed_data"], cwd=BACKEND_DIR, env=base_env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        wait_until_up(f"http://127.0.0.1:{llm_port}/health")
+
+        for name in [c.strip() for c in args.configurations.split(",") if c.strip()]:
+            env = dict(base_env, **CONFIGURATIONS[name])
+            imports = [measure_import(env) for _ in range(args.runs)]
+            boots = [measure_boot(env, ask=env["APP_MODE"] != "search") for _ in range(args.runs)]
+            result = {
+                "configuration": name,
+                "import_ms": round(float(np.median([t for t, _ in imports])) * 1000, 1),
+                "import_mb": round(float(np.median([mb for _, mb in imports])), 1),
+                "health_ms": round(float(np.median([b["health_s"] for b in boots])) * 1000, 1),
+                "ready_ms": round(float(np.median([b["ready_s"] for b in boots])) * 1000, 1),
+                "rss_mb": round(float(np.median([b["rss_mb"] for b in boots])), 1) if boots[0]["rss_mb"] else None,
+                "first_ask_ms": round(float(np.median([b["first_ask_s"] for b in boots])) * 1000, 1)
+                if "first_ask_s" in boots[0] else None,
+            }
+            results.append(result)
+            print(f"{name}: {result}", file=sys.stderr)
+    finally:
+        fake_llm.terminate()
+        fake_llm.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    header = f"{'configuration':<16}{'import ms':>11}{'import MB':>11}{'health ms':>11}{'ready ms':>10}{'RSS MB':>9}{'1st ask ms':>12}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['configuration']:<16}{r['import_ms']:>11.1f}{r['import_mb']:>11.1f}{r['health_ms']:>11.1f}"
+            f"{r['ready_ms']:>10.1f}{r['rss_mb'] or 0:>9.1f}{r['first_ask_ms'] or 0:>12.1f}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
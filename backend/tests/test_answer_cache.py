@@ -0,0 +1,93 @@
+"""
+Embedding calls made by the answer cache, offline: SQLite, the local vector
+store and hashing embeddings, as in benchmarks/run.py.
+
+    python -m pytest -q tests
+"""
+import os
+import tempfile
+
+WORKDIR = tempfile.mkdtemp(prefix="bus-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    VECTOR_STORE_BACKEND="local",
+    VECTOR_STORE_PATH=os.path.join(WORKDIR, "vector_store"),
+    EMBEDDING_BACKEND="hashing",
+    ANSWER_CACHE_ENABLED="true",
+    RETRIEVAL_MODE="hybrid",
+)
+
+import pytest
+
+from app.database import SessionLocal
+from app.seed_data import seed_database
+from app.query_router import get_query_router
+
+
+@pytest.fixture(scope="module")
+def router():
+    seed_database()
+    return get_query_router()
+
+
+@pytest.fixture
+def embedding_calls(router):
+    """
+    Count calls to the pipeline's embedding function
+    """
+    pipeline = router.rag_pipeline
+    embed = pipeline.embedding_function
+    calls = []
+
+    def counting(texts):
+        calls.append(list(texts))
+        return embed(texts)
+
+    pipeline.embedding_function = counting
+    yield calls
+    pipeline.embedding_function = embed
+
+
+def lookup_and_retrieve(router, question: str):
+    """
+    The cache lookup and context retrieval an uncached provider question goes through
+    """
+    db = SessionLocal()
+    try:
+        cached, ctx = router._cache_lookup(question, db)
+    finally:
+        db.close()
+    assert cached is None
+    context = router.rag_pipeline.retrieve_relevant_context(question, query_embedding=ctx['embedding'])
+    return ctx, context
+
+
+@pytest.mark.parametrize("question", ["16460"])
+def test_lexical_only_question_makes_no_embedding_call(router, embedding_calls, question):
+    pipeline = router.rag_pipeline
+    assert not pipeline._mentioned_providers(question)
+    assert not pipeline.needs_vector_search(question)
+
+    ctx, (docs, _) = lookup_and_retrieve(router, question)
+    assert docs
+    assert ctx['embedding'] is None
+    assert embedding_calls == []
+
+
+@pytest.mark.parametrize("question", ["Hanif contact number", "What is Soudia address"])
+def test_provider_question_makes_no_embedding_call(router, embedding_calls, question):
+    assert router.rag_pipeline._mentioned_providers(question)
+
+    ctx, (docs, _) = lookup_and_retrieve(router, question)
+    assert docs
+    assert ctx['embedding'] is None
+    assert embedding_calls == []
+
+
+def test_vector_search_question_embeds_once(router, embedding_calls):
+    question = "Which operator has the most comfortable seats for night journeys?"
+    assert router.rag_pipeline.needs_vector_search(question)
+
+    ctx, _ = lookup_and_retrieve(router, question)
+    assert ctx['embedding'] is not None
+    assert len(embedding_calls) == 1
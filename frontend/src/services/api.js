@@ -9,12 +9,42 @@ const api = axios.create({
   },
 });
 
+// Last search results per request body with their ETag; browsers don't cache POST
+// responses, so revalidate them ourselves and reuse the data on 304 Not Modified.
+// Holds the SEARCH_CACHE_SIZE most recently used searches (a Map iterates in
+// insertion order, so re-inserting on use and evicting the first key is an LRU)
+const SEARCH_CACHE_SIZE = 20;
+const searchCache = new Map();
+
+const rememberSearch = (key, entry) => {
+  searchCache.delete(key);
+  searchCache.set(key, entry);
+  if (searchCache.size > SEARCH_CACHE_SIZE) {
+    searchCache.delete(searchCache.keys().next().value);
+  }
+};
+
 export const searchBuses = async (fromDistrict, toDistrict, maxPrice) => {
-  const response = await api.post('/api/buses/search', {
+  const body = {
     from_district: fromDistrict,
     to_district: toDistrict,
     max_price: maxPrice || null,
+  };
+  const key = JSON.stringify(body);
+  const cached = searchCache.get(key);
+  const response = await api.post('/api/buses/search', body, {
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
   });
+  if (response.status === 304 && cached) {
+    rememberSearch(key, cached);
+    return cached.data;
+  }
+  if (response.headers.etag) {
+    rememberSearch(key, { etag: response.headers.etag, data: response.data });
+  } else {
+    searchCache.delete(key);
+  }
   return response.data;
 };
 
@@ -35,9 +65,18 @@ export const createBooking = async (bookingData) => {
   return response.data;
 };
 
+// History is paged on the server; follow X-Next-Cursor until every booking is loaded
 export const getBookingsByPhone = async (phone) => {
-  const response = await api.get(`/api/bookings/${phone}`);
-  return response.data;
+  const bookings = [];
+  let cursor = null;
+  do {
+    const response = await api.get(`/api/bookings/${phone}`, {
+      params: cursor ? { limit: 500, cursor } : { limit: 500 },
+    });
+    bookings.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return bookings;
 };
 
 export const cancelBooking = async (bookingId) => {